@@ -0,0 +1,53 @@
+"""Conan hook resolving ``tools.get``/``tools.download`` from the store filled by source_mirror.py.
+
+Install it with::
+
+    cp .github/hooks/source_mirror.py ~/.conan/hooks/
+    conan config set hooks.source_mirror
+    export CONAN_SOURCE_MIRROR=/srv/conan-sources
+
+While a recipe runs ``source()``, downloads with a ``sha256`` are copied from
+``$CONAN_SOURCE_MIRROR/<sha256[:2]>/<sha256>`` when present. Files in the store were verified when
+they were added, so they are not hashed again. Set ``CONAN_SOURCE_MIRROR_OFFLINE=1`` to fail instead
+of falling back to the network when a file is missing from the store.
+"""
+import os
+import shutil
+
+from conans.client.tools import net
+from conans.errors import ConanException
+
+
+_original_download = None
+
+
+def _mirror_download(url, filename, *args, **kwargs):
+    store = os.environ.get("CONAN_SOURCE_MIRROR")
+    sha256 = (kwargs.get("sha256") or "").lower()
+    if store and sha256:
+        cached = os.path.join(store, sha256[:2], sha256)
+        if os.path.isfile(cached):
+            if os.path.exists(filename) and not kwargs.get("overwrite"):
+                raise ConanException("Error, the file to download already exists: '%s'" % filename)
+            shutil.copyfile(cached, filename)
+            return
+    if os.environ.get("CONAN_SOURCE_MIRROR_OFFLINE") in ("1", "True", "true"):
+        raise ConanException("%s (sha256: %s) is not available in the source mirror %s" % (url, sha256 or "unknown", store))
+    return _original_download(url, filename, *args, **kwargs)
+
+
+def pre_source(output, conanfile_path, **kwargs):
+    global _original_download
+    if not os.environ.get("CONAN_SOURCE_MIRROR") or _original_download is not None:
+        return
+    # tools.get() and the conans.tools.download() wrapper look up net.download at call time
+    _original_download = net.download
+    net.download = _mirror_download
+    output.info("Resolving sources from mirror %s" % os.environ["CONAN_SOURCE_MIRROR"])
+
+
+def post_source(output, conanfile_path, **kwargs):
+    global _original_download
+    if _original_download is not None:
+        net.download = _original_download
+        _original_download = None
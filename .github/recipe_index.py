@@ -0,0 +1,208 @@
+"""Prebuilt index of every recipe's config.yml and conandata.yml.
+
+Parsing the ~2500 yml files of the repository with PyYAML takes several seconds, so the parsed
+content is stored in a single JSON file next to the recipes. Each entry remembers the mtime, size
+and sha256 of the file it came from; on load only the files whose stat changed are read again and
+only those whose content changed are parsed again.
+
+    index = RecipeIndex.load()
+    index.versions("zlib")              # {"1.2.12": "all", "1.2.11": "all"}
+    index.newest_versions("zlib")       # {"all": "1.2.12"}
+    index.sources("zlib", "1.2.11")     # {"url": [...], "sha256": "..."}
+    index.patches("zlib", "1.2.11")     # [{"patch_file": ..., "base_path": ...}, ...]
+
+It can also be used from the command line, e.g. ``python .github/recipe_index.py versions zlib``.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+
+import packaging.version
+import yaml
+
+
+INDEX_FORMAT = 1
+DEFAULT_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+DEFAULT_INDEX = os.path.join(".github", ".recipe-index.json")
+
+
+def _normalize(data):
+    # Unquoted yml keys such as 1.10 are loaded as floats, the recipes always use them as strings
+    if isinstance(data, dict):
+        return {str(k): _normalize(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [_normalize(v) for v in data]
+    if data is None or isinstance(data, (str, int, float, bool)):
+        return data
+    return str(data)
+
+
+def _version_key(version):
+    try:
+        return 1, packaging.version.Version(version)
+    except packaging.version.InvalidVersion:
+        return 0, packaging.version.Version("0")
+
+
+class RecipeIndex(object):
+
+    def __init__(self, root=DEFAULT_ROOT, index_file=None):
+        self.root = root
+        self.index_file = os.path.join(root, index_file or DEFAULT_INDEX)
+        self._files = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, root=DEFAULT_ROOT, index_file=None, save=True):
+        """Loads the index, refreshing the entries of the yml files that changed on disk."""
+        index = cls(root, index_file)
+        index._read()
+        index.update()
+        if save and index._dirty:
+            index.save()
+        return index
+
+    def _read(self):
+        try:
+            with open(self.index_file, "r") as f:
+                content = json.load(f)
+        except (OSError, ValueError):
+            return
+        if content.get("format") == INDEX_FORMAT:
+            self._files = content.get("files", {})
+
+    def save(self):
+        tmp = "%s.%d.tmp" % (self.index_file, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump({"format": INDEX_FORMAT, "files": self._files}, f, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp, self.index_file)
+        self._dirty = False
+
+    def _yml_files(self):
+        recipes = os.path.join(self.root, "recipes")
+        files = glob.glob(os.path.join(recipes, "*", "config.yml"))
+        files += glob.glob(os.path.join(recipes, "*", "*", "conandata.yml"))
+        return [os.path.relpath(f, self.root).replace(os.sep, "/") for f in files]
+
+    def update(self):
+        """Synchronizes the index with the yml files found under recipes/."""
+        present = set(self._yml_files())
+        for stale in set(self._files) - present:
+            del self._files[stale]
+            self._dirty = True
+        for path in present:
+            self._refresh(path)
+
+    def _refresh(self, path):
+        filename = os.path.join(self.root, path)
+        st = os.stat(filename)
+        entry = self._files.get(path)
+        if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return
+        with open(filename, "rb") as f:
+            content = f.read()
+        sha256 = hashlib.sha256(content).hexdigest()
+        if not entry or entry["sha256"] != sha256:
+            try:
+                data = _normalize(yaml.safe_load(content)) or {}
+            except yaml.YAMLError as e:
+                print("Error parsing %s: %s" % (path, e), file=sys.stderr)
+                data = {}
+            entry = {"data": data}
+        entry.update({"mtime": st.st_mtime_ns, "size": st.st_size, "sha256": sha256})
+        self._files[path] = entry
+        self._dirty = True
+
+    def _data(self, path):
+        entry = self._files.get(path)
+        return entry["data"] if entry else {}
+
+    def packages(self):
+        return sorted(p.split("/")[1] for p in self._files if p.endswith("/config.yml"))
+
+    def versions(self, package):
+        """Returns a {version: folder} dict from the config.yml of the package."""
+        versions = self._data("recipes/%s/config.yml" % package).get("versions") or {}
+        return {v: (info or {}).get("folder") for v, info in versions.items()}
+
+    def folder(self, package, version):
+        return self.versions(package).get(version)
+
+    def folder_versions(self, package, folder):
+        return [v for v, f in self.versions(package).items() if f == folder]
+
+    def newest_versions(self, package):
+        """Returns a {folder: version} dict with the newest version exported from each folder."""
+        result = {}
+        for version, folder in self.versions(package).items():
+            if folder not in result or _version_key(version) > _version_key(result[folder]):
+                result[folder] = version
+        return result
+
+    def conandata(self, package, folder):
+        return self._data("recipes/%s/%s/conandata.yml" % (package, folder))
+
+    def _version_data(self, package, version, key):
+        folder = self.folder(package, version)
+        if folder is None:
+            return None
+        return (self.conandata(package, folder).get(key) or {}).get(version)
+
+    def sources(self, package, version):
+        """Returns the conandata.yml sources entry of a version, as written in the recipe."""
+        return self._version_data(package, version, "sources")
+
+    def source_urls(self, package, version):
+        """Returns a list of (url, sha256) tuples for the sources of a version."""
+        result = []
+        pending = [self.sources(package, version)]
+        while pending:
+            item = pending.pop(0)
+            if isinstance(item, list):
+                pending[0:0] = item
+            elif isinstance(item, dict):
+                if "url" in item:
+                    urls = item["url"] if isinstance(item["url"], list) else [item["url"]]
+                    result.extend((url, item.get("sha256")) for url in urls)
+                else:
+                    pending[0:0] = list(item.values())
+        return result
+
+    def patches(self, package, version):
+        """Returns the list of patches of a version, as written in conandata.yml."""
+        return self._version_data(package, version, "patches") or []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the prebuilt index of recipe yml files")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="root of the conan-center-index checkout")
+    parser.add_argument("--index", default=None, help="index file, relative to the root (default: %s)" % DEFAULT_INDEX)
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("update", help="build or refresh the index")
+    for command in ["versions", "newest"]:
+        subparsers.add_parser(command).add_argument("package")
+    for command in ["sources", "patches"]:
+        subparser = subparsers.add_parser(command)
+        subparser.add_argument("package")
+        subparser.add_argument("version")
+    args = parser.parse_args()
+
+    index = RecipeIndex.load(args.root, args.index)
+    if args.command == "versions":
+        result = index.versions(args.package)
+    elif args.command == "newest":
+        result = index.newest_versions(args.package)
+    elif args.command == "sources":
+        result = index.sources(args.package, args.version)
+    elif args.command == "patches":
+        result = index.patches(args.package, args.version)
+    else:
+        return
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,183 @@
+import argparse
+import hashlib
+import json
 import os
 import yaml
 import packaging.version
 import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 
+DEFAULT_CACHE = os.path.join(".github", ".runlint-cache.json")
+_output_lock = threading.Lock()
 
-def main():
+
+def changed_recipes():
     packages = set()
     files = subprocess.run(["git", "show", "--first-parent", "--name-only", r'--pretty="format:%n"'], capture_output=True, text=True)
     for line in files.stdout.splitlines():
         parts = line.split("/")
         if len(parts) >= 4:
             packages.add(parts[1] + "/" + parts[2])
-    for line in packages:
-        package = line.split("/")[0]
-        version = None
-        folder = line.split("/")[1]
-        with open(os.path.join("recipes", package, "config.yml"), "r") as file:
-            config = yaml.safe_load(file)
-            for v in config["versions"]:
-                if config["versions"][v]["folder"] != folder:
-                    continue
-                try:
-                    if not version or packaging.version.Version(v) > packaging.version.Version(version):
-                        version = v
-                except packaging.version.InvalidVersion:
-                    print("Error parsing version %s for package %s" % (v, package))
-
-        if version:
-            command = ["conan", "export", os.path.join("recipes", package, folder), "%s/%s@" % (package, version)]
-            p = subprocess.run(command, check=False)
+    return sorted(packages)
+
+
+def folder_versions(package, folder, index=None):
+    if index:
+        return index.folder_versions(package, folder)
+    with open(os.path.join("recipes", package, "config.yml"), "r") as file:
+        config = yaml.safe_load(file)
+    return [v for v in config["versions"] if config["versions"][v]["folder"] == folder]
+
+
+def newest_version(package, versions):
+    version = None
+    for v in versions:
+        try:
+            if not version or packaging.version.Version(v) > packaging.version.Version(version):
+                version = v
+        except packaging.version.InvalidVersion:
+            print("Error parsing version %s for package %s" % (v, package))
+    return version
+
+
+def folder_hash(path):
+    sha = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            filename = os.path.join(root, name)
+            sha.update(os.path.relpath(filename, path).replace(os.sep, "/").encode())
+            sha.update(b"\0")
+            with open(filename, "rb") as file:
+                sha.update(file.read())
+            sha.update(b"\0")
+    return sha.hexdigest()
+
+
+def load_cache(path):
+    if not path or not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        print("Ignoring unreadable export cache %s" % path)
+        return {}
+
+
+def save_cache(path, cache):
+    if not path:
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w") as file:
+        json.dump(cache, file, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _print_block(text):
+    # Keep the output of each export in one block so the problem matchers still see whole lines
+    with _output_lock:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+def export(package, folder, version):
+    command = ["conan", "export", os.path.join("recipes", package, folder), "%s/%s@" % (package, version)]
+    p = subprocess.run(command, check=False, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    _print_block(p.stdout)
+    return p.returncode == 0
+
+
+def export_versions(package, folder, versions):
+    command = [sys.executable, os.path.abspath(__file__), "--export-batch", os.path.join("recipes", package, folder), package] + versions
+    p = subprocess.run(command, check=False, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    _print_block(p.stdout)
+    return p.returncode == 0
+
+
+def export_batch(path, name, versions):
+    """Export several versions of one recipe folder within a single Conan application.
+
+    Conan's loader caches the parsed conanfile module and its conandata.yml per path, so
+    reusing the same app only pays the recipe/conandata parsing for the first version.
+    """
+    from conans.client.conan_api import ConanAPIV1
+    from conans.client.cmd.export import cmd_export
+    from conans.errors import ConanException
+
+    conan_api = ConanAPIV1()
+    conan_api.create_app()
+    app = conan_api.app
+    app.load_remotes()
+    conanfile_path = os.path.abspath(os.path.join(path, "conanfile.py"))
+    failed = False
+    for version in versions:
+        try:
+            cmd_export(app, conanfile_path, name, version, None, None, keep_source=False)
+        except ConanException as e:
+            app.out.error("%s/%s: %s" % (name, version, e))
+            failed = True
+    return 1 if failed else 0
+
+
+def process(line, cache, all_versions, index=None):
+    package, folder = line.split("/")
+    versions = folder_versions(package, folder, index)
+    if not all_versions:
+        version = newest_version(package, versions)
+        versions = [version] if version else []
+    if not versions:
+        return [(line, None)]
+    # The folder is hashed once and the digest shared by every version exported from it
+    digest = folder_hash(os.path.join("recipes", package, folder))
+    keys = {v: "%s/%s" % (package, v) for v in versions}
+    pending = [v for v in versions if cache.get(keys[v]) != digest]
+    for v in versions:
+        if v not in pending:
+            print("Skipping %s, recipe folder unchanged since last export" % keys[v])
+    if not pending:
+        ok = True
+    elif all_versions:
+        ok = export_versions(package, folder, pending)
+    else:
+        ok = export(package, folder, pending[0])
+    return [(keys[v], digest if ok or v not in pending else None) for v in versions]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the recipes changed by the last commit so the conan hooks lint them")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of concurrent `conan export` processes")
+    parser.add_argument("--cache", default=DEFAULT_CACHE,
+                        help="file storing the recipe folder hashes of successful exports (default: %(default)s)")
+    parser.add_argument("--no-cache", dest="cache", action="store_const", const=None, help="always export, ignoring the cache")
+    parser.add_argument("-a", "--all-versions", action="store_true",
+                        help="export every version listed in config.yml for a changed folder, not only the newest one")
+    parser.add_argument("--index", action="store_true", help="read config.yml files through the prebuilt recipe index (see recipe_index.py)")
+    parser.add_argument("--export-batch", nargs="+", metavar="ARG", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.export_batch:
+        path, name, versions = args.export_batch[0], args.export_batch[1], args.export_batch[2:]
+        sys.exit(export_batch(path, name, versions))
+
+    cache = load_cache(args.cache)
+    index = None
+    if args.index:
+        from recipe_index import RecipeIndex
+        index = RecipeIndex.load()
+    packages = changed_recipes()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        results = list(executor.map(lambda line: process(line, cache, args.all_versions, index), packages))
+
+    for key, digest in (r for result in results for r in result):
+        if digest:
+            cache[key] = digest
+        else:
+            cache.pop(key, None)
+    save_cache(args.cache, cache)
 
 if __name__ == "__main__":
     # execute only if run as a script
@@ -0,0 +1,99 @@
+"""Content-addressed mirror of the source tarballs referenced by conandata.yml.
+
+Every ``sources`` entry with a sha256 is downloaded once into ``<store>/<sha256[:2]>/<sha256>``,
+verified while it is written and only then moved in place, so the store never holds a file whose
+name does not match its content. Entries shared by several versions or recipes are fetched once.
+
+    python .github/source_mirror.py --store /srv/conan-sources -j 16
+    python .github/source_mirror.py --store /srv/conan-sources zlib boost
+
+Consumers resolve ``tools.get``/``tools.download`` from the store with the ``source_mirror`` conan
+hook in ``.github/hooks/source_mirror.py``.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from recipe_index import RecipeIndex
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def store_path(store, sha256):
+    sha256 = sha256.lower()
+    return os.path.join(store, sha256[:2], sha256)
+
+
+def collect_sources(index, packages=None):
+    """Returns a {sha256: [urls]} dict for every source of the requested packages."""
+    sources = {}
+    for package in packages or index.packages():
+        for version in index.versions(package):
+            for url, sha256 in index.source_urls(package, version):
+                if not sha256 or not isinstance(sha256, str):
+                    continue
+                urls = sources.setdefault(sha256.lower(), [])
+                if url not in urls:
+                    urls.append(url)
+    return sources
+
+
+def fetch(store, sha256, urls, timeout=60):
+    destination = store_path(store, sha256)
+    if os.path.isfile(destination):
+        return True
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    for url in urls:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(destination), prefix=".tmp-")
+        try:
+            sha = hashlib.sha256()
+            with os.fdopen(fd, "wb") as f, urllib.request.urlopen(url, timeout=timeout) as response:
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                    sha.update(chunk)
+                    f.write(chunk)
+            if sha.hexdigest() != sha256:
+                print("Checksum mismatch for %s: expected %s, got %s" % (url, sha256, sha.hexdigest()), file=sys.stderr)
+                continue
+            os.replace(tmp, destination)
+            print("Fetched %s" % url)
+            return True
+        except Exception as e:
+            print("Could not download %s: %s" % (url, e), file=sys.stderr)
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefetch the sources listed in conandata.yml files into a content-addressed store")
+    parser.add_argument("packages", nargs="*", help="packages to mirror (default: all of them)")
+    parser.add_argument("--store", default=os.environ.get("CONAN_SOURCE_MIRROR"), help="store folder (default: $CONAN_SOURCE_MIRROR)")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="number of concurrent downloads")
+    parser.add_argument("--timeout", type=int, default=60, help="socket timeout in seconds")
+    parser.add_argument("--dry-run", action="store_true", help="only report what is missing from the store")
+    args = parser.parse_args()
+    if not args.store:
+        parser.error("no store given, use --store or set CONAN_SOURCE_MIRROR")
+
+    sources = collect_sources(RecipeIndex.load(), args.packages)
+    missing = {sha256: urls for sha256, urls in sources.items() if not os.path.isfile(store_path(args.store, sha256))}
+    print("%d sources referenced, %d missing from %s" % (len(sources), len(missing), args.store))
+    if args.dry_run or not missing:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        results = list(executor.map(lambda item: fetch(args.store, item[0], item[1], args.timeout), missing.items()))
+    failed = results.count(False)
+    if failed:
+        print("%d sources could not be mirrored" % failed, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
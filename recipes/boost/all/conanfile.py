@@ -4,6 +4,8 @@ from conans import ConanFile, tools
 from conans.errors import ConanException, ConanInvalidConfiguration
 
 import glob
+import hashlib
+import json
 import os
 import re
 import sys
@@ -100,6 +102,9 @@ class BoostConan(ConanFile):
         "with_stacktrace_backtrace": [True, False],
         "buildid": "ANY",
         "python_buildid": "ANY",
+        "b2_jobs": "ANY",  # number of parallel b2 jobs, tools.cpu_count() if None
+        "b2_memory_per_job": "ANY",  # MiB of RAM budgeted per b2 job, caps the jobs to the available memory
+        "b2_load_limit": "ANY",  # do not start more jobs than would bring the load average above this value
     }
     options.update({"without_{}".format(_name): [True, False] for _name in CONFIGURE_OPTIONS})
 
@@ -136,6 +141,9 @@ class BoostConan(ConanFile):
         "with_stacktrace_backtrace": True,
         "buildid": None,
         "python_buildid": None,
+        "b2_jobs": None,
+        "b2_memory_per_job": None,
+        "b2_load_limit": None,
     }
     default_options.update({"without_{}".format(_name): False for _name in CONFIGURE_OPTIONS})
     default_options.update({"without_{}".format(_name): True for _name in ("graph_parallel", "mpi", "python")})
@@ -143,6 +151,7 @@ class BoostConan(ConanFile):
     short_paths = True
     no_copy_source = True
     _cached_dependencies = None
+    _cached_python_info = None
 
     def export_sources(self):
         for patch in self.conan_data.get("patches", {}).get(self.version, []):
@@ -185,39 +194,70 @@ class BoostConan(ConanFile):
             self._cached_dependencies = yaml.safe_load(open(dependencies_filepath))
         return self._cached_dependencies
 
+    def _transitive_closures(self):
+        # Dependency files generated by rebuild-dependencies.py contain the precomputed closures.
+        # For older files, compute them once and keep them with the cached dependencies.
+        if "transitive_dependencies" not in self._dependencies:
+            closures = {}
+
+            def visit(module):
+                if module not in closures:
+                    closures[module] = set()
+                    for dependency in self._dependencies["dependencies"][module]:
+                        closures[module].add(dependency)
+                        closures[module].update(visit(dependency))
+                return closures[module]
+
+            super_modules = {}
+            for module in self._dependencies["dependencies"]:
+                for dependency in visit(module):
+                    super_modules.setdefault(dependency, set()).add(module)
+            self._dependencies["transitive_dependencies"] = closures
+            self._dependencies["transitive_super_modules"] = super_modules
+        return self._dependencies["transitive_dependencies"], self._dependencies["transitive_super_modules"]
+
     def _all_dependent_modules(self, name):
-        dependencies = {name}
-        while True:
-            new_dependencies = set()
-            for dependency in dependencies:
-                new_dependencies.update(set(self._dependencies["dependencies"][dependency]))
-                new_dependencies.update(dependencies)
-            if len(new_dependencies) > len(dependencies):
-                dependencies = new_dependencies
-            else:
-                break
-        return dependencies
+        return {name}.union(self._transitive_closures()[0][name])
 
     def _all_super_modules(self, name):
-        dependencies = {name}
-        while True:
-            new_dependencies = set(dependencies)
-            for module in self._dependencies["dependencies"]:
-                if dependencies.intersection(set(self._dependencies["dependencies"][module])):
-                    new_dependencies.add(module)
-            if len(new_dependencies) > len(dependencies):
-                dependencies = new_dependencies
-            else:
-                break
-        return dependencies
+        return {name}.union(self._transitive_closures()[1].get(name, []))
 
     @property
     def _source_subfolder(self):
         return "source_subfolder"
 
+    _bcp_dir_file = "conan_bcp_dir.txt"
+
     @property
     def _bcp_dir(self):
-        return "custom-boost"
+        # Another configuration may tweak the shared sources again between build() and package(),
+        # so package() uses the name build() computed
+        bcp_dir_file = os.path.join(self.build_folder, self._bcp_dir_file)
+        if os.path.isfile(bcp_dir_file):
+            return tools.load(bcp_dir_file).strip()
+        return self._tweaked_sources_bcp_dir
+
+    @property
+    def _tweaked_sources_bcp_dir(self):
+        # The bcp copy lives in the source folder, shared by all the configurations of this version
+        # (no_copy_source), and is reused by those using the same namespace and the same tweaked sources
+        key = hashlib.sha1("{}:{}".format(self.options.namespace, self.options.namespace_alias).encode())
+        for path in self._build_tweaked_files:
+            path = os.path.join(self.source_folder, self._source_subfolder, path)
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    key.update(f.read())
+        return "custom-boost-{}".format(key.hexdigest()[:12])
+
+    @property
+    def _build_tweaked_files(self):
+        # Files of the source tree modified by build(), depending on the configuration
+        return [
+            os.path.join("libs", "stacktrace", "build", "Jamfile.v2"),
+            os.path.join("boost", "stacktrace", "detail", "libbacktrace_impls.hpp"),
+            os.path.join("tools", "build", "src", "tools", "gcc.jam"),
+            os.path.join("libs", "fiber", "build", "Jamfile.v2"),
+        ]
 
     @property
     def _is_msvc(self):
@@ -375,6 +415,15 @@ class BoostConan(ConanFile):
             del self.options.numa
 
     def validate(self):
+        for option, kind in (("b2_jobs", int), ("b2_memory_per_job", int), ("b2_load_limit", float)):
+            value = self.options.get_safe(option)
+            if value:
+                try:
+                    if kind(str(value)) <= 0:
+                        raise ValueError
+                except ValueError:
+                    raise ConanInvalidConfiguration("{} must be a positive number".format(option))
+
         if not self.options.multithreading:
             # * For the reason 'thread' is deactivate look at https://stackoverflow.com/a/20991533
             #   Look also on the comments of the answer for more details
@@ -510,6 +559,9 @@ class BoostConan(ConanFile):
         else:
             del self.info.options.debug_level
             del self.info.options.pch
+            del self.info.options.b2_jobs
+            del self.info.options.b2_memory_per_job
+            del self.info.options.b2_load_limit
             del self.info.options.python_executable  # PATH to the interpreter is not important, only version matters
             if self.options.without_python:
                 del self.info.options.python_version
@@ -549,6 +601,50 @@ class BoostConan(ConanFile):
         output = output.strip()
         return output if output != "None" else None
 
+    # sysconfig variables queried by _python_includes and _python_library_dir
+    _PYTHON_CONFIG_VARS = ("INCLUDEPY", "INCLUDEDIR", "LIBRARY", "LDLIBRARY", "LIBDIR", "MULTIARCH", "multiarchsubdir", "WITH_DYLD", "LIBDEST")
+
+    @property
+    def _python_info(self):
+        """
+        obtain all the properties of the python interpreter needed by the recipe, running it only once per executable
+        :return: dict with the version, abiflags, sysconfig paths and sysconfig/distutils variables of the interpreter
+        """
+        if self._cached_python_info is None:
+            self._cached_python_info = {}
+        python_executable = self._python_executable
+        if python_executable not in self._cached_python_info:
+            # distutils is deprecated and breaks the recipe since Python 3.10, and may not be installed
+            # before (e.g. python3-distutils on Debian), then only the sysconfig values are returned
+            output = self._run_python_script("from __future__ import print_function; "
+                                             "import json, sys, sysconfig; "
+                                             "names = {names}; "
+                                             "du = None; "
+                                             "exec('try:\\n import distutils.sysconfig as du\\nexcept Exception:\\n du = None') if sys.version_info < (3, 10) else None; "
+                                             "print(json.dumps({{"
+                                             "'version': '{{}}.{{}}'.format(sys.version_info[0], sys.version_info[1]), "
+                                             "'abiflags': getattr(sys, 'abiflags', ''), "
+                                             "'inc': getattr(sysconfig, 'get_python_inc', lambda: None)(), "
+                                             "'paths': dict((n, sysconfig.get_path(n)) for n in ['include', 'platinclude']), "
+                                             "'sc_vars': dict((n, sysconfig.get_config_var(n)) for n in names), "
+                                             "'du_vars': dict((n, du.get_config_var(n)) for n in names) if du else {{}}"
+                                             "}}))".format(names=list(self._PYTHON_CONFIG_VARS)))
+            try:
+                info = json.loads(output) if output else {}
+            except ValueError:
+                self.output.warn("couldn't parse the output of {}".format(python_executable))
+                info = {}
+            self._cached_python_info[python_executable] = info
+        return self._cached_python_info[python_executable]
+
+    @staticmethod
+    def _python_value(value):
+        # Keep the values as they were printed by a python one-liner
+        if value is None:
+            return None
+        value = str(value).strip()
+        return value if value != "None" else None
+
     def _get_python_path(self, name):
         """
         obtain path entry for the python installation
@@ -557,9 +653,7 @@ class BoostConan(ConanFile):
         """
         # https://docs.python.org/3/library/sysconfig.html
         # https://docs.python.org/2.7/library/sysconfig.html
-        return self._run_python_script("from __future__ import print_function; "
-                                       "import sysconfig; "
-                                       "print(sysconfig.get_path('{}'))".format(name))
+        return self._python_value(self._python_info.get("paths", {}).get(name))
 
     def _get_python_sc_var(self, name):
         """
@@ -567,9 +661,7 @@ class BoostConan(ConanFile):
         :param name: name of variable to be queried (such as LIBRARY or LDLIBRARY)
         :return: value of python sysconfig variable
         """
-        return self._run_python_script("from __future__ import print_function; "
-                                       "import sysconfig; "
-                                       "print(sysconfig.get_config_var('{}'))".format(name))
+        return self._python_value(self._python_info.get("sc_vars", {}).get(name))
 
     def _get_python_du_var(self, name):
         """
@@ -578,9 +670,7 @@ class BoostConan(ConanFile):
         :param name: name of variable to be queried (such as LIBRARY or LDLIBRARY)
         :return: value of python sysconfig variable
         """
-        return self._run_python_script("from __future__ import print_function; "
-                                       "import distutils.sysconfig as du_sysconfig; "
-                                       "print(du_sysconfig.get_config_var('{}'))".format(name))
+        return self._python_value(self._python_info.get("du_vars", {}).get(name))
 
     def _get_python_var(self, name):
         """
@@ -590,22 +680,14 @@ class BoostConan(ConanFile):
 
         NOTE: distutils is deprecated and breaks the recipe since Python 3.10
         """
-        python_version_parts = self.info.options.python_version.split('.')
-        python_major = int(python_version_parts[0])
-        python_minor = int(python_version_parts[1])
-        if(python_major >= 3 and python_minor >= 10):
-            return self._get_python_sc_var(name)
-        else:
-            return self._get_python_sc_var(name) or self._get_python_du_var(name)
+        return self._get_python_sc_var(name) or self._get_python_du_var(name)
 
     def _detect_python_version(self):
         """
         obtain version of python interpreter
         :return: python interpreter version, in format major.minor
         """
-        return self._run_python_script("from __future__ import print_function; "
-                                       "import sys; "
-                                       "print('{}.{}'.format(sys.version_info[0], sys.version_info[1]))")
+        return self._python_value(self._python_info.get("version"))
 
 
     @property
@@ -622,9 +704,7 @@ class BoostConan(ConanFile):
         obtain the result of the "sysconfig.get_python_inc()" call
         :return: result of the "sysconfig.get_python_inc()" execution
         """
-        return self._run_python_script("from __future__ import print_function; "
-                                       "import sysconfig; "
-                                       "print(sysconfig.get_python_inc())")
+        return self._python_value(self._python_info.get("inc"))
 
     @property
     def _python_abiflags(self):
@@ -632,9 +712,7 @@ class BoostConan(ConanFile):
         obtain python ABI flags, see https://www.python.org/dev/peps/pep-3149/ for the details
         :return: the value of python ABI flags
         """
-        return self._run_python_script("from __future__ import print_function; "
-                                       "import sys; "
-                                       "print(getattr(sys, 'abiflags', ''))")
+        return self._python_value(self._python_info.get("abiflags"))
 
     @property
     def _python_includes(self):
@@ -713,8 +791,6 @@ class BoostConan(ConanFile):
         clean_dirs = [
             os.path.join(self.build_folder, "bin.v2"),
             os.path.join(self.build_folder, "architecture"),
-            os.path.join(self.source_folder, self._bcp_dir),
-            os.path.join(src, "dist", "bin"),
             os.path.join(src, "stage"),
             os.path.join(src, "tools", "build", "src", "engine", "bootstrap"),
             os.path.join(src, "tools", "build", "src", "engine", "bin.ntx86"),
@@ -729,6 +805,62 @@ class BoostConan(ConanFile):
     def _b2_exe(self):
         return "b2.exe" if tools.os_info.is_windows else "b2"
 
+    @staticmethod
+    def _available_memory_mb():
+        """
+        obtain the physical memory available for new processes on the build machine
+        identical copies live in the boost, qt/5.x.x and qt/6.x.x recipes, a fix must be made to all of them
+        :return: available memory in MiB, or None if it can't be determined
+        """
+        try:
+            with open("/proc/meminfo") as meminfo:
+                for line in meminfo:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) // 1024
+        except (IOError, OSError, ValueError):
+            pass
+        try:
+            return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+        except (AttributeError, ValueError, OSError):
+            pass
+        if tools.os_info.is_windows:
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("sullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullAvailPhys // (1024 * 1024)
+        return None
+
+    @property
+    def _b2_jobs(self):
+        """
+        number of parallel b2 jobs, from the b2_jobs option or the cpu count, capped by the memory budget and load limit
+        """
+        jobs = int(str(self.options.b2_jobs)) if self.options.b2_jobs else tools.cpu_count()
+        if self.options.b2_memory_per_job:
+            available = self._available_memory_mb()
+            if available is None:
+                self.output.warn("Unable to determine the available memory, b2_memory_per_job is ignored")
+            else:
+                jobs = min(jobs, available // int(str(self.options.b2_memory_per_job)))
+        if self.options.b2_load_limit:
+            # b2 has no load limit of its own (its -l is a time limit): apply it to the job count when the build starts
+            if hasattr(os, "getloadavg"):
+                jobs = min(jobs, int(float(str(self.options.b2_load_limit)) - os.getloadavg()[0]))
+            else:
+                self.output.warn("Load average is not available on this platform, b2_load_limit is ignored")
+        jobs = max(1, jobs)
+        self.output.info("Building with {} b2 jobs".format(jobs))
+        return jobs
+
     @property
     def _bcp_exe(self):
         folder = os.path.join(self.source_folder, self._source_subfolder, "dist", "bin")
@@ -747,18 +879,24 @@ class BoostConan(ConanFile):
         return os.path.join(self.source_folder, self._source_subfolder, "tools", "build")
 
     def _build_bcp(self):
+        if os.path.isfile(self._bcp_exe):
+            self.output.info("Reusing {}".format(self._bcp_exe))
+            return
         folder = os.path.join(self.source_folder, self._source_subfolder, "tools", "bcp")
         with tools.vcvars(self.settings) if self._is_msvc else tools.no_op():
             with tools.chdir(folder):
-                command = "%s -j%s --abbreviate-paths toolset=%s" % (self._b2_exe, tools.cpu_count(), self._toolset)
+                command = "%s -j%s --abbreviate-paths toolset=%s" % (self._b2_exe, self._b2_jobs, self._toolset)
                 command += " -d%d" % self.options.debug_level
                 self.output.warn(command)
                 self.run(command, run_environment=True)
 
     def _run_bcp(self):
+        bcp_dir = self._bcp_dir
+        # Write to a temporary folder first: an interrupted or concurrent bcp run must never leave a partial tree behind
+        bcp_tmp_dir = "{}.tmp{}".format(bcp_dir, os.getpid())
         with tools.vcvars(self.settings) if self._is_msvc or self._is_clang_cl else tools.no_op():
             with tools.chdir(self.source_folder):
-                os.mkdir(self._bcp_dir)
+                os.mkdir(bcp_tmp_dir)
                 namespace = "--namespace=%s" % self.options.namespace
                 alias = "--namespace-alias" if self.options.namespace_alias else ""
                 boostdir = "--boost=%s" % self._source_subfolder
@@ -776,9 +914,14 @@ class BoostConan(ConanFile):
                                                                    alias=alias,
                                                                    libraries=libraries,
                                                                    boostdir=boostdir,
-                                                                   outdir=self._bcp_dir)
+                                                                   outdir=bcp_tmp_dir)
                 self.output.warn(command)
                 self.run(command)
+                try:
+                    os.rename(bcp_tmp_dir, bcp_dir)
+                except OSError:
+                    # Another build of the same namespace finished first
+                    shutil.rmtree(bcp_tmp_dir)
 
     def build(self):
         if tools.cross_building(self, skip_x64_x86=True):
@@ -809,6 +952,9 @@ class BoostConan(ConanFile):
                               "    <link>shared:<library>.//boost_fiber : <conditional>@numa",
                               strict=False)
 
+        if self._use_bcp:
+            tools.save(os.path.join(self.build_folder, self._bcp_dir_file), self._tweaked_sources_bcp_dir)
+
         if self.options.header_only:
             self.output.warn("Header only package, skipping build")
             return
@@ -816,8 +962,11 @@ class BoostConan(ConanFile):
         self._clean()
 
         if self._use_bcp:
-            self._build_bcp()
-            self._run_bcp()
+            if os.path.isdir(os.path.join(self.source_folder, self._bcp_dir)):
+                self.output.info("Reusing bcp tree {}".format(self._bcp_dir))
+            else:
+                self._build_bcp()
+                self._run_bcp()
 
         # Help locating bzip2 and zlib
         self._create_user_config_jam(self._boost_build_dir)
@@ -1097,7 +1246,7 @@ class BoostConan(ConanFile):
         flags.extend([
             "install",
             "--prefix=%s" % self.package_folder,
-            "-j%s" % tools.cpu_count(),
+            "-j%s" % self._b2_jobs,
             "--abbreviate-paths",
             "-d%d" % self.options.debug_level,
         ])
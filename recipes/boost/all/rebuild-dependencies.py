@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 import dataclasses
+import hashlib
+import os
 from pathlib import Path
 import re
 import subprocess
 import tempfile
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from conans import tools
 import logging
@@ -94,6 +97,8 @@ class BoostDependenciesExport(object):
     libs: Dict[str, List[str]] = dataclasses.field(default_factory=dict)
     requirements: Dict[str, List[str]] = dataclasses.field(default_factory=dict)
     static_only: List[str] = dataclasses.field(default_factory=list)
+    transitive_dependencies: Dict[str, List[str]] = dataclasses.field(default_factory=dict)
+    transitive_super_modules: Dict[str, List[str]] = dataclasses.field(default_factory=dict)
 
 
 @dataclasses.dataclass
@@ -103,30 +108,48 @@ class BoostDependencies(object):
 
 
 class BoostDependencyBuilder(object):
-    def __init__(self, boost_version: str, boostdep_version: str, tmppath: Path, git_url: str, outputdir: Path, unsafe: bool):
+    def __init__(self, boost_version: str, boostdep_version: str, tmppath: Path, git_url: str, outputdir: Path, unsafe: bool,
+                 worktree: bool = False, boostdep_path: Optional[Path] = None, jamcache_path: Optional[Path] = None):
         self.boost_version = boost_version
         self.boostdep_version = boostdep_version
         self.git_url = git_url
         self.tmppath = tmppath
         self.outputdir = outputdir
         self.unsafe = unsafe
+        self.worktree = worktree
+        self._boostdep_path = boostdep_path
+        self._jamcache_path = jamcache_path
 
     @property
-    def boost_path(self) -> Path:
+    def repo_path(self) -> Path:
         return self.tmppath / "boost"
 
+    @property
+    def boost_path(self) -> Path:
+        if self.worktree:
+            return self.tmppath / "boost-worktrees" / self.boost_version
+        return self.repo_path
+
+    @property
+    def boostdep_path(self) -> Path:
+        return self._boostdep_path or self.boost_path
+
+    @property
+    def jamcache_path(self) -> Path:
+        return self._jamcache_path or self.tmppath / "jamfile-cache"
+
     def do_git_update(self) -> None:
-        if not self.boost_path.exists():
+        if not self.repo_path.exists():
             with tools.chdir(str(self.tmppath)):
                 print("Cloning boost git")
                 subprocess.check_call(["git", "clone", "--", self.git_url, "boost"])
-            with tools.chdir(str(self.boost_path)):
+            with tools.chdir(str(self.repo_path)):
                 print("Checking out current master")
                 subprocess.check_call(["git", "checkout", "origin/master"])
                 print("Removing master branch")
                 subprocess.check_call(["git", "branch", "-D", "master"])
         else:
-            with tools.chdir(str(self.boost_path)):
+            with tools.chdir(str(self.repo_path)):
                 print("Updating git repo")
                 subprocess.check_call(["git", "fetch", "origin"])
                 print("Removing all local changes to git repo")
@@ -154,14 +177,54 @@ class BoostDependencyBuilder(object):
             print("Removing unknown files/directories")
             subprocess.check_call(["git", "clean", "-d", "-f"])
 
-    def do_install_boostdep(self):
+    def do_git_worktree_add(self):
+        # Modifies the configuration shared by all worktrees, so this must not run concurrently
+        with tools.chdir(str(self.repo_path)):
+            subprocess.check_call(["git", "worktree", "prune"])
+        if not self.boost_path.exists():
+            with tools.chdir(str(self.repo_path)):
+                print("Adding worktree for version {}".format(self.boost_version))
+                subprocess.check_call(["git", "worktree", "add", "--force", "--detach", str(self.boost_path), "boost-{}".format(self.boost_version)])
         with tools.chdir(str(self.boost_path)):
+            subprocess.check_call(["git", "submodule", "init"])
+
+    def do_git_submodule_clone(self):
+        # The submodules of the main checkout are the reference of the worktree submodules,
+        # so they are only downloaded once
+        with tools.chdir(str(self.repo_path)):
+            print("Cloning the git submodules of the main checkout")
+            subprocess.check_call(["git", "submodule", "update", "--init"])
+
+    def _submodules(self) -> List[Tuple[str, str]]:
+        output = subprocess.check_output(["git", "config", "-f", ".gitmodules", "--get-regexp", r"^submodule\..*\.path$"], text=True)
+        submodules = []
+        for line in output.splitlines():
+            key, path = line.split(" ", 1)
+            submodules.append((key[len("submodule."):-len(".path")], path))
+        return submodules
+
+    def do_git_worktree_update(self):
+        with tools.chdir(str(self.boost_path)):
+            print("Checking out version {} in its worktree".format(self.boost_version))
+            subprocess.check_call(["git", "checkout", "--force", "--detach", "boost-{}".format(self.boost_version)])
+            for name, path in self._submodules():
+                command = ["git", "submodule", "update", "--force"]
+                reference = self.repo_path / ".git" / "modules" / name
+                if reference.is_dir():
+                    # Only the objects missing from the main checkout are fetched
+                    command += ["--reference", str(reference)]
+                subprocess.check_call(command + ["--", path])
+            subprocess.check_call(["git", "clean", "-d", "-f"])
+
+    def do_install_boostdep(self):
+        self.boostdep_path.mkdir(parents=True, exist_ok=True)
+        with tools.chdir(str(self.boostdep_path)):
             print("Installing boostdep/{}".format(self.boostdep_version))
             subprocess.check_call(["conan", "install", "boostdep/{}@".format(self.boostdep_version), "-g", "json"])
 
     @property
     def _bin_paths(self):
-        with tools.chdir(str(self.boost_path)):
+        with tools.chdir(str(self.boostdep_path)):
             data = json.loads(open("conanbuildinfo.json").read())
             return data["dependencies"][0]["bin_paths"]
 
@@ -189,6 +252,37 @@ class BoostDependencyBuilder(object):
             res.add(l)
         return list(res)
 
+    # Bump when the scan below changes, results of older scans are then no longer used
+    _JAMCACHE_VERSION = 1
+
+    def _scan_jamfile(self, jam: Path) -> Dict[str, List[str]]:
+        # Most Jamfiles do not change between releases: cache the scan results by git blob hash.
+        # One file per blob keeps the cache safe to share between parallel workers.
+        contents = jam.read_bytes()
+        blob = hashlib.sha1(b"blob %d\0" % len(contents) + contents).hexdigest()
+        cache_file = self.jamcache_path / "v{}".format(self._JAMCACHE_VERSION) / "{}.json".format(blob)
+        if cache_file.is_file():
+            log.debug("Using cached scan of %s (%s)", jam, blob)
+            return json.loads(cache_file.read_text())
+
+        text = contents.decode()
+        using = self._grep_libs("\n(.*)using\\s+([^ ;:]+)\\s*", text)
+        libs = self._grep_libs("\n(.*)\\s(?:searched-)?lib\\s+([^ \t\n;:]+)", text)
+
+        buildable_libs = re.findall("[ \n](boost-)?lib ([a-zA-Z0-9_]+)[ \n]", text)
+        buildable_libs = set("boost_{}".format(lib) if lib_prefix else lib for lib_prefix, lib in buildable_libs)
+        buildable_libs = set(l[len("boost_"):] for l in buildable_libs if l.startswith("boost_"))  # list(filter(lambda l: l.startswith("boost"), buildable_libs))
+
+        result = {
+            "requirements": sorted(using + libs),
+            "libs": sorted(buildable_libs),
+        }
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name("{}.{}.tmp".format(cache_file.name, os.getpid()))
+        tmp_file.write_text(json.dumps(result))
+        tmp_file.replace(cache_file)
+        return result
+
     def _grep_requirements(self, component: str) -> List[str]:
         jam = self.boost_path / "libs" / component / "build" / "Jamfile.v2"
         if not jam.is_file():
@@ -196,13 +290,7 @@ class BoostDependencyBuilder(object):
         if not jam.is_file():
             log.warning("Can't find Jamfile for %s. Unable to determine dependencies.", component)
             return []
-        contents = jam.open().read()
-
-        using = self._grep_libs("\n(.*)using\\s+([^ ;:]+)\\s*", contents)
-        libs = self._grep_libs("\n(.*)\\s(?:searched-)?lib\\s+([^ \t\n;:]+)", contents)
-
-        requirements = using + libs
-        return requirements
+        return self._scan_jamfile(jam)["requirements"]
 
     def _sort_requirements(self, requirements: List[str]) -> Tuple[List[str], Dict[str, List[str]], List[str]]:
         conan_requirements = set()
@@ -332,6 +420,31 @@ class BoostDependencyBuilder(object):
             raise Exception("Dependency cycle detected. Remaining tree: {}".format(remaining_tree))
         return deptree
 
+    @staticmethod
+    def transitive_closures(deptree: Dict[str, List[str]]) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        """
+        Returns, for every module, all the modules it depends on (transitively) and all the modules depending on it.
+        The module itself is not part of its closures. The dependency tree must be acyclic.
+        """
+        closure = {}
+
+        def visit(module):
+            if module not in closure:
+                deps = set()
+                for dependency in deptree.get(module, []):
+                    deps.add(dependency)
+                    deps.update(visit(dependency))
+                closure[module] = deps
+            return closure[module]
+
+        for module in deptree:
+            visit(module)
+        super_modules = {module: set() for module in closure}
+        for module, deps in closure.items():
+            for dependency in deps:
+                super_modules.setdefault(dependency, set()).add(module)
+        return {k: sorted(v) for k, v in closure.items()}, {k: sorted(v) for k, v in super_modules.items()}
+
     @staticmethod
     def _boostify_library(lib: str) -> str:
         return "boost_{}".format(lib)
@@ -347,10 +460,7 @@ class BoostDependencyBuilder(object):
                 buildable_jam = next(construct_jam(jam_ext) for jam_ext in ("", ".v2") if construct_jam(jam_ext).is_file())
             except StopIteration:
                 raise Exception("Cannot find jam build file for {}".format(buildable))
-            jam_text = buildable_jam.read_text()
-            buildable_libs = re.findall("[ \n](boost-)?lib ([a-zA-Z0-9_]+)[ \n]", jam_text)
-            buildable_libs = set("boost_{}".format(lib) if lib_prefix else lib for lib_prefix, lib in buildable_libs)
-            buildable_libs = set(l[len("boost_"):] for l in buildable_libs if l.startswith("boost_"))  # list(filter(lambda l: l.startswith("boost"), buildable_libs))
+            buildable_libs = set(self._scan_jamfile(buildable_jam)["libs"])
 
             if not buildable_libs:
                 # Some boost releases support multiple python versions
@@ -415,6 +525,7 @@ class BoostDependencyBuilder(object):
         tree = self.do_create_libraries(tree)
 
         tree.export.dependencies = self._fix_dependencies(tree.export.dependencies)
+        tree.export.transitive_dependencies, tree.export.transitive_super_modules = self.transitive_closures(tree.export.dependencies)
 
         data = dataclasses.asdict(tree.export)
         if self.unsafe:
@@ -427,15 +538,41 @@ class BoostDependencyBuilder(object):
             yaml.dump(data, fout)
 
 
+def _add_transitive_closures(outputdir: Path, boost_versions: List[str]) -> int:
+    for boost_version in boost_versions:
+        path = outputdir / "dependencies-{}.yml".format(boost_version)
+        if not path.is_file():
+            log.error("%s does not exist", path)
+            return 1
+        data = yaml.safe_load(path.open())
+        data["transitive_dependencies"], data["transitive_super_modules"] = BoostDependencyBuilder.transitive_closures(data["dependencies"])
+        print("Updating {}".format(path))
+        with path.open("w") as fout:
+            yaml.dump(data, fout)
+    return 0
+
+
+def _create_dependency_file_in_worktree(boost_collector: BoostDependencyBuilder) -> str:
+    boost_collector.do_git_worktree_update()
+    boost_collector.do_create_dependency_file()
+    return boost_collector.boost_version
+
+
 def main(args=None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--verbose", dest="verbose", action="store_true", help="verbose output")
-    parser.add_argument("-t", dest="tmppath", help="temporary folder where to clone boost (default is system temporary folder)")
+    parser.add_argument("-t", dest="tmppath", type=Path, help="temporary folder where to clone boost (default is system temporary folder)")
     parser.add_argument("-d", dest="boostdep_version", default="1.75.0", type=str, help="boostdep version")
     parser.add_argument("-u", dest="git_url", default=BOOST_GIT_URL, help="boost git url")
     parser.add_argument("-U", dest="git_update", action="store_true", help="update the git repo")
     parser.add_argument("-o", dest="outputdir", default=None, type=Path, help="output dependency dir")
     parser.add_argument("-x", dest="unsafe", action="store_true", help="unsafe fast(er) operation")
+    parser.add_argument("-c", dest="jamcache_path", default=None, type=Path,
+                        help="folder caching the Jamfile scan results (default is jamfile-cache in the temporary folder)")
+    parser.add_argument("-C", dest="closures_only", action="store_true",
+                        help="only (re)compute the transitive closures of existing dependency files, without running boostdep")
+    parser.add_argument("-j", dest="jobs", default=1, type=int,
+                        help="number of versions processed in parallel, each one in its own git worktree (default: 1, no worktrees)")
 
     version_group = parser.add_mutually_exclusive_group(required=True)
     version_group.add_argument("-v", dest="boost_version", help="boost version")
@@ -463,6 +600,12 @@ def main(args=None) -> int:
     else:
         boost_versions = [ns.boost_version]
 
+    if ns.closures_only:
+        return _add_transitive_closures(ns.outputdir, boost_versions)
+
+    if ns.jobs > 1:
+        return _main_worktrees(ns, boost_versions)
+
     for boost_version in boost_versions:
         print("Starting {}".format(boost_version))
         boost_collector = BoostDependencyBuilder(
@@ -472,6 +615,7 @@ def main(args=None) -> int:
             outputdir=ns.outputdir,
             tmppath=ns.tmppath,
             unsafe=ns.unsafe,
+            jamcache_path=ns.jamcache_path,
         )
 
         if not ns.git_update and not boost_collector.boost_path.exists():
@@ -490,6 +634,40 @@ def main(args=None) -> int:
     return 0
 
 
+def _main_worktrees(ns, boost_versions: List[str]) -> int:
+    boost_collectors = [BoostDependencyBuilder(
+        boost_version=boost_version,
+        boostdep_version=ns.boostdep_version,
+        git_url=ns.git_url,
+        outputdir=ns.outputdir,
+        tmppath=ns.tmppath,
+        unsafe=ns.unsafe,
+        worktree=True,
+        boostdep_path=ns.tmppath / "boostdep-{}".format(ns.boostdep_version),
+        jamcache_path=ns.jamcache_path,
+    ) for boost_version in boost_versions]
+
+    if not ns.git_update and not boost_collectors[0].repo_path.exists():
+        log.error("Boost directory does not exist. Re-execute this script with -U to run 'git update'.")
+        return 1
+
+    if ns.git_update:
+        boost_collectors[0].do_git_update()
+
+    boost_collectors[0].do_git_submodule_clone()
+
+    # boostdep only reads the sources, one installation serves all versions
+    boost_collectors[0].do_install_boostdep()
+
+    for boost_collector in boost_collectors:
+        boost_collector.do_git_worktree_add()
+
+    with ProcessPoolExecutor(max_workers=ns.jobs) as executor:
+        for boost_version in executor.map(_create_dependency_file_in_worktree, boost_collectors):
+            print("Finished {}".format(boost_version))
+    return 0
+
+
 if __name__ == "__main__":
     import sys
     sys.exit(main())
@@ -1,9 +1,14 @@
 from conans import AutoToolsBuildEnvironment, ConanFile, MSBuild, tools
-from conans.errors import ConanInvalidConfiguration
+from conans.errors import ConanException, ConanInvalidConfiguration
 from io import StringIO
+import fnmatch
+import glob
+import hashlib
 import os
 import re
+import shutil
 import textwrap
+import zipfile
 
 required_conan_version = ">=1.33.0"
 
@@ -22,14 +27,25 @@ class CPythonConan(ConanFile):
         "fPIC": [True, False],
         "optimizations": [True, False],
         "lto": [True, False],
+        "pgo_task": "ANY",  # arguments of the instrumented interpreter, e.g. the path of a training script
+        "pgo_profile_export": [True, False],
+        "pgo_profile_import": "ANY",  # folder with a profile exported by a previous build
         "docstrings": [True, False],
         "pymalloc": [True, False],
+        "computed_gotos": ["auto", True, False],
+        "with_mimalloc": [True, False],  # link mimalloc as the malloc replacement, pair with pymalloc=False to use it for all objects
+        "bolt": [True, False],  # post-link optimization of the interpreter/libpython with llvm-bolt
         "with_bz2": [True, False],
         "with_gdbm": [True, False],
         "with_nis": [True, False],
         "with_sqlite3": [True, False],
         "with_tkinter": [True, False],
         "with_curses": [True, False],
+        "strip_stdlib": [True, False],  # drop the test suites, idlelib and turtledemo from the stdlib
+        "stdlib_zip": [True, False],  # pack the pure python stdlib packages into lib/pythonXY.zip
+        "bytecode_level0": [True, False],  # precompile the stdlib .pyc files
+        "bytecode_level1": [True, False],  # ... the .opt-1.pyc files (python -O)
+        "bytecode_level2": [True, False],  # ... the .opt-2.pyc files (python -OO)
 
         # Python 2 options
         "unicode": ["ucs2", "ucs4"],
@@ -45,14 +61,25 @@ class CPythonConan(ConanFile):
         "fPIC": True,
         "optimizations": False,
         "lto": False,
+        "pgo_task": None,
+        "pgo_profile_export": False,
+        "pgo_profile_import": None,
         "docstrings": True,
         "pymalloc": True,
+        "computed_gotos": "auto",
+        "with_mimalloc": False,
+        "bolt": False,
         "with_bz2": True,
         "with_gdbm": True,
         "with_nis": False,
         "with_sqlite3": True,
         "with_tkinter": True,
         "with_curses": True,
+        "strip_stdlib": False,
+        "stdlib_zip": False,
+        "bytecode_level0": True,
+        "bytecode_level1": True,
+        "bytecode_level2": True,
 
         # Python 2 options
         "unicode": "ucs2",
@@ -103,14 +130,29 @@ class CPythonConan(ConanFile):
             del self.options.fPIC
         if self.settings.compiler == "Visual Studio":
             del self.options.lto
+            del self.options.pgo_task
+            del self.options.pgo_profile_export
+            del self.options.pgo_profile_import
             del self.options.docstrings
             del self.options.pymalloc
+            del self.options.computed_gotos
+            del self.options.with_mimalloc
+            del self.options.bolt
             del self.options.with_curses
+            del self.options.strip_stdlib
+            del self.options.stdlib_zip
+            del self.options.bytecode_level0
+            del self.options.bytecode_level1
+            del self.options.bytecode_level2
             del self.options.with_gdbm
             del self.options.with_nis
         if self._is_py2:
             # Python 2.xx does not support following options
             del self.options.with_lzma
+            del self.options.stdlib_zip
+            del self.options.bytecode_level0
+            del self.options.bytecode_level1
+            del self.options.bytecode_level2
         elif self._is_py3:
             # Python 3.xx does not support following options
             del self.options.with_bsddb
@@ -132,6 +174,8 @@ class CPythonConan(ConanFile):
         if self.settings.compiler == "Visual Studio":
             # The msbuild generator only works with Visual Studio
             self.generators.append("MSBuildDeps")
+        if self.options.get_safe("with_mimalloc"):
+            self.options["mimalloc"].override = True
 
     def validate(self):
         if self.options.shared:
@@ -156,11 +200,38 @@ class CPythonConan(ConanFile):
             if not self.options.shared and tools.Version(self._version_number_only) >= "3.10":
                 raise ConanInvalidConfiguration("Static msvc build disabled (>=3.10) due to \"AttributeError: module 'sys' has no attribute 'winver'\"")
 
+        if not self.options.optimizations:
+            for option in ("pgo_task", "pgo_profile_export", "pgo_profile_import"):
+                if self.options.get_safe(option):
+                    raise ConanInvalidConfiguration("{} requires cpython:optimizations=True".format(option))
+        if self.options.get_safe("pgo_profile_export") or self.options.get_safe("pgo_profile_import"):
+            if tools.Version(self._version_number_only) < "3.8":
+                # The Makefile of older versions removes the profile data at the end of the build
+                raise ConanInvalidConfiguration("Exporting or importing PGO profile data requires cpython 3.8 or newer")
+            if self.options.pgo_profile_export and self.options.pgo_profile_import:
+                raise ConanInvalidConfiguration("pgo_profile_export and pgo_profile_import cannot be enabled together")
+
+        if self.options.get_safe("bolt"):
+            if self.settings.os != "Linux" or str(self.settings.arch) not in ("x86_64", "armv8"):
+                raise ConanInvalidConfiguration("BOLT only supports Linux x86_64 and armv8 binaries")
+            if self._is_py2:
+                raise ConanInvalidConfiguration("bolt requires python 3")
+            if tools.cross_building(self):
+                raise ConanInvalidConfiguration("bolt trains the built interpreter, it is not available when cross building")
+
+        if tools.cross_building(self):
+            if self.options.get_safe("stdlib_zip"):
+                raise ConanInvalidConfiguration("stdlib_zip runs the built interpreter, it is not available when cross building")
+            if not all(self.options.get_safe("bytecode_level{}".format(level), True) for level in range(3)):
+                raise ConanInvalidConfiguration("Disabling some bytecode_level* options is not available when cross building")
+
         if self.options.get_safe("with_curses", False) and not self.options["ncurses"].with_widec:
             raise ConanInvalidConfiguration("cpython requires ncurses with wide character support")
 
     def package_id(self):
         del self.info.options.env_vars
+        if self.info.options.get_safe("pgo_profile_import"):
+            self.info.options.pgo_profile_import = self._pgo_profile_sha256(str(self.info.options.pgo_profile_import))
 
     def source(self):
         tools.get(**self.conan_data["sources"][self.version],
@@ -206,6 +277,8 @@ class CPythonConan(ConanFile):
             self.requires("libdb/5.3.28")
         if self.options.get_safe("with_lzma", False):
             self.requires("xz_utils/5.2.5")
+        if self.options.get_safe("with_mimalloc"):
+            self.requires("mimalloc/2.0.3")
 
     def _configure_autotools(self):
         if self._autotools:
@@ -254,6 +327,14 @@ class CPythonConan(ConanFile):
         if self.settings.os in ("Linux", "FreeBSD"):
             # Building _testembed fails due to missing pthread/rt symbols
             self._autotools.link_flags.append("-lpthread")
+        if self.options.computed_gotos != "auto":
+            conf_args.append("--with-computed-gotos={}".format(yes_no(self.options.computed_gotos)))
+        if self.options.with_mimalloc:
+            # the other dependencies are found by configure/setup.py, mimalloc must be linked explicitly
+            self._autotools.libs.extend(self.deps_cpp_info["mimalloc"].libs + self.deps_cpp_info["mimalloc"].system_libs)
+        if self.options.bolt:
+            # llvm-bolt needs the relocations to rewrite the binary
+            self._autotools.link_flags.append("-Wl,--emit-relocs")
 
         build = None
         if tools.cross_building(self) and not tools.cross_building(self, skip_x64_x86=True):
@@ -424,8 +505,94 @@ class CPythonConan(ConanFile):
         if self.settings.compiler == "Visual Studio":
             self._msvc_build()
         else:
+            if self.options.bolt:
+                # Fail before the build, the binaries are only optimized once installed by package()
+                for tool in ("llvm-bolt", "merge-fdata"):
+                    if not tools.which(tool):
+                        raise ConanException("bolt=True requires {} in PATH".format(tool))
             autotools = self._configure_autotools()
-            autotools.make()
+            if self.options.get_safe("pgo_profile_import"):
+                self._import_pgo_profile()
+            autotools.make(args=self._make_args)
+
+    @property
+    def _bolt_targets(self):
+        # With a shared build, the interpreter code lives in libpython
+        if self.options.shared:
+            return glob.glob(os.path.join(self.package_folder, "lib", "libpython{}*.so.1.0".format(self._version_suffix)))
+        return [self._cpython_interpreter_path]
+
+    def _bolt_optimize(self):
+        """
+        Runs on the installed files: make install relinks the interpreter/libpython whenever the
+        Makefile changed since the build, which would drop the optimized binaries.
+        """
+        task = str(self.options.pgo_task) if self.options.get_safe("pgo_task") else "-m test --pgo"
+        profile_dir = os.path.join(self.build_folder, "bolt")
+        tools.rmdir(profile_dir)
+        tools.mkdir(profile_dir)
+        targets = self._bolt_targets
+        for target in targets:
+            name = os.path.basename(target)
+            self.run("llvm-bolt \"{0}\" -instrument -instrumentation-file-append-pid -instrumentation-file=\"{1}\" -o \"{0}.bolt_inst\"".format(
+                target, os.path.join(profile_dir, name)))
+            shutil.copy2(target, target + ".prebolt")
+            shutil.copy2(target + ".bolt_inst", target)
+        # Failing tests of the training workload do not matter, like with PGO.
+        # Writing bytecode would leave .pyc files of the training run in the package.
+        with tools.environment_append({"PYTHONDONTWRITEBYTECODE": "1"}):
+            self._run_packaged_python(task, ignore_errors=True)
+        for target in targets:
+            name = os.path.basename(target)
+            fdata = os.path.join(profile_dir, name + ".fdata")
+            self.run("merge-fdata {} > \"{}\"".format(os.path.join(profile_dir, name + ".*.fdata"), fdata))
+            self.run("llvm-bolt \"{0}.prebolt\" -o \"{0}\" -data=\"{1}\" -update-debug-sections -reorder-blocks=ext-tsp "
+                     "-reorder-functions=hfsort+ -split-functions -icf=1 -inline-all -split-eh "
+                     "-reorder-functions-use-hot-size -peepholes=none -jump-tables=aggressive -inline-ap "
+                     "-indirect-call-promotion=all -dyno-stats -use-gnu-stack -frame-opt=hot".format(target, fdata))
+            os.unlink(target + ".prebolt")
+            os.unlink(target + ".bolt_inst")
+
+    @property
+    def _make_args(self):
+        args = []
+        if self.options.get_safe("pgo_task"):
+            args.append("PROFILE_TASK=\"{}\"".format(self.options.pgo_task))
+        return args
+
+    # gcc writes one .gcda file next to each object, clang merges its profile into code.profclangd
+    _pgo_profile_patterns = ("*.gcda", "code.profclangd")
+    _pgo_profile_subfolder = os.path.join("res", "pgo-profile")
+
+    def _pgo_profile_files(self, profile_dir):
+        if not os.path.isdir(profile_dir):
+            raise ConanException("PGO profile folder {} does not exist".format(profile_dir))
+        profile_files = []
+        for root, dirs, files in os.walk(profile_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if any(fnmatch.fnmatch(name, pattern) for pattern in self._pgo_profile_patterns):
+                    profile_files.append(os.path.relpath(os.path.join(root, name), profile_dir))
+        return profile_files
+
+    def _pgo_profile_sha256(self, profile_dir):
+        # The package id depends on the profile contents, not on the folder it was imported from
+        sha = hashlib.sha256()
+        for relpath in self._pgo_profile_files(profile_dir):
+            sha.update(relpath.replace(os.sep, "/").encode())
+            sha.update(tools.sha256sum(os.path.join(profile_dir, relpath)).encode())
+        return sha.hexdigest()
+
+    def _import_pgo_profile(self):
+        profile_dir = str(self.options.pgo_profile_import)
+        profile_files = self._pgo_profile_files(profile_dir)
+        self.output.info("Using the PGO profile from {}, skipping the training run".format(profile_dir))
+        for relpath in profile_files:
+            dst = os.path.join(self.build_folder, os.path.dirname(relpath))
+            tools.mkdir(dst)
+            shutil.copy2(os.path.join(profile_dir, relpath), dst)
+        # profile-opt only rebuilds with the profile once this stamp exists
+        tools.save(os.path.join(self.build_folder, "profile-run-stamp"), "")
 
     @property
     def _msvc_artifacts_path(self):
@@ -534,7 +701,13 @@ class CPythonConan(ConanFile):
             tools.remove_files_by_mask(os.path.join(self.package_folder, "bin"), "vcruntime*")
         else:
             autotools = self._configure_autotools()
-            autotools.install()
+            if self._precompile_stdlib_in_package:
+                # Bytecode is compiled once by _precompile_stdlib(), after the stdlib has been stripped/zipped
+                tools.replace_in_file("Makefile", "$(DESTDIR)$(LIBDEST)/compileall.py", "-c pass", strict=False)
+            autotools.install(args=self._make_args)
+            if self.options.get_safe("pgo_profile_export"):
+                for pattern in self._pgo_profile_patterns:
+                    self.copy(pattern, src=self.build_folder, dst=self._pgo_profile_subfolder, keep_path=True)
             tools.rmdir(os.path.join(self.package_folder, "lib", "pkgconfig"))
             tools.rmdir(os.path.join(self.package_folder, "share"))
 
@@ -566,8 +739,114 @@ class CPythonConan(ConanFile):
 
             if not os.path.exists(self._cpython_symlink):
                 os.symlink("python{}".format(self._version_suffix), self._cpython_symlink)
+
+            if self.options.bolt:
+                # Before stripping the stdlib, the default training task runs its test suite
+                self._bolt_optimize()
+            if self.options.strip_stdlib:
+                self._strip_stdlib()
+            if self.options.get_safe("stdlib_zip"):
+                self._zip_stdlib()
+            if self._precompile_stdlib_in_package:
+                self._precompile_stdlib()
         self._fix_install_name()
 
+    @property
+    def _bytecode_levels(self):
+        return [level for level in range(3) if self.options.get_safe("bytecode_level{}".format(level))]
+
+    @property
+    def _precompile_stdlib_in_package(self):
+        # Otherwise make install compiles every level, serially before python 3.9 and before any stripping/zipping
+        return self._is_py3 and self.settings.compiler != "Visual Studio" and not tools.cross_building(self)
+
+    @property
+    def _stdlib_path(self):
+        version = tools.Version(self._version_number_only)
+        return os.path.join(self.package_folder, "lib", "python{}.{}".format(version.major, version.minor))
+
+    _stdlib_unused_subfolders = (
+        "test", "idlelib", "turtledemo", "tkinter/test", "lib-tk/test", "lib2to3/tests", "distutils/tests",
+        "ctypes/test", "sqlite3/test", "unittest/test", "bsddb/test", "json/tests", "email/test",
+    )
+
+    def _strip_stdlib(self):
+        for subfolder in self._stdlib_unused_subfolders:
+            tools.rmdir(os.path.join(self._stdlib_path, *subfolder.split("/")))
+
+    def _run_packaged_python(self, args, ignore_errors=False):
+        libdir = os.path.join(self.package_folder, "lib")
+        with tools.environment_append({"LD_LIBRARY_PATH": libdir, "DYLD_LIBRARY_PATH": libdir}):
+            self.run("\"{}\" {}".format(self._cpython_interpreter_path, args), ignore_errors=ignore_errors)
+
+    def _zip_stdlib(self):
+        """
+        Moves the stdlib modules and packages that are pure python (no data files) into lib/pythonXY.zip,
+        which the interpreter puts on sys.path ahead of lib/pythonX.Y.
+        os.py stays on disk: the interpreter looks for it to find its prefix.
+        zipimport only loads plain .pyc files, so the archive holds bytecode with bytecode_level0
+        and the sources otherwise.
+        """
+        stdlib = self._stdlib_path
+        excluded = {"site-packages", "lib-dynload", "__pycache__", "os.py"}
+
+        def pure_python(folder):
+            for root, dirs, files in os.walk(folder):
+                dirs[:] = [d for d in dirs if d != "__pycache__"]
+                if any(not f.endswith((".py", ".pyc")) for f in files):
+                    return False
+            return True
+
+        entries = []
+        for name in sorted(os.listdir(stdlib)):
+            path = os.path.join(stdlib, name)
+            if name in excluded:
+                continue
+            if os.path.isfile(path) and name.endswith(".py") and not name.startswith("_sysconfigdata"):
+                entries.append(name)
+            elif os.path.isfile(os.path.join(path, "__init__.py")) and pure_python(path):
+                entries.append(name)
+
+        if self.options.bytecode_level0:
+            # zipimport only loads bytecode stored next to the sources, not from __pycache__
+            self._run_packaged_python("-m compileall -q -b -j0 -x \"{}\" {}".format(
+                self._compileall_exclude, " ".join("\"{}\"".format(os.path.join(stdlib, e)) for e in entries)))
+        version = tools.Version(self._version_number_only)
+        archive = os.path.join(self.package_folder, "lib", "python{}{}.zip".format(version.major, version.minor))
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zf:
+            for entry in entries:
+                path = os.path.join(stdlib, entry)
+                if os.path.isfile(path):
+                    files = [f for f in (path, path + "c") if os.path.isfile(f)]
+                else:
+                    files = [os.path.join(root, f) for root, _, fs in os.walk(path) for f in fs if "__pycache__" not in root]
+                for f in sorted(files):
+                    arcname = os.path.relpath(f, stdlib).replace(os.sep, "/")
+                    if f.endswith(".pyc"):
+                        zf.write(f, arcname)
+                    elif not os.path.isfile(f + "c"):
+                        # keep the sources that could not be compiled (e.g. python 2 only code in lib2to3 tests)
+                        zf.write(f, arcname)
+        for entry in entries:
+            path = os.path.join(stdlib, entry)
+            if os.path.isfile(path):
+                os.remove(path)
+                if os.path.isfile(path + "c"):
+                    os.remove(path + "c")
+                for cached in glob.glob(os.path.join(stdlib, "__pycache__", "{}.*.pyc".format(entry[:-3]))):
+                    os.remove(cached)
+            else:
+                tools.rmdir(path)
+
+    # Same exclusions as the libinstall target of the Makefile: files that don't compile on purpose and site-packages
+    _compileall_exclude = "bad_coding|badsyntax|site-packages|lib2to3/tests/data"
+
+    def _precompile_stdlib(self):
+        flags = {0: "", 1: "-O ", 2: "-OO "}
+        for level in self._bytecode_levels:
+            self._run_packaged_python("{}-m compileall -q -f -j0 -x \"{}\" \"{}\"".format(
+                flags[level], self._compileall_exclude, self._stdlib_path))
+
     @property
     def _cpython_symlink(self):
         symlink = os.path.join(self.package_folder, "bin", "python")
@@ -665,6 +944,8 @@ class CPythonConan(ConanFile):
         self.cpp_info.components["embed"].libdirs = [libdir]
         self.cpp_info.components["embed"].names["pkg_config"] = "python-{}.{}-embed".format(py_version.major, py_version.minor)
         self.cpp_info.components["embed"].requires = ["python"]
+        if self.options.get_safe("with_mimalloc"):
+            self.cpp_info.components["embed"].requires.append("mimalloc::mimalloc")
 
         self.cpp_info.components["_embed_copy"].requires = ["embed"]
         self.cpp_info.components["_embed_copy"].names["pkg_config"] = ["python{}-embed".format(py_version.major)]
@@ -700,6 +981,9 @@ class CPythonConan(ConanFile):
                 self.cpp_info.components["_hidden"].requires.append("tk::tk")
             self.cpp_info.components["_hidden"].libdirs = []
 
+        if self.options.get_safe("pgo_profile_export"):
+            self.user_info.pgo_profile = os.path.join(self.package_folder, self._pgo_profile_subfolder)
+
         if self.options.env_vars:
             bindir = os.path.join(self.package_folder, "bin")
             self.output.info("Appending PATH environment variable: {}".format(bindir))
@@ -149,6 +149,24 @@ class TestPackageConan(ConanFile):
         except ConanException:
             return False
 
+    def _run_benchmark(self):
+        # Opt-in, e.g. CPYTHON_BENCHMARK=default or CPYTHON_BENCHMARK=json_loads,nbody
+        # CPYTHON_BENCHMARK_BASELINE=<result of a previous run> compares against it
+        benchmarks = tools.get_env("CPYTHON_BENCHMARK")
+        if not benchmarks:
+            return
+        python = self.deps_user_info["cpython"].python
+        venv = os.path.join(self.build_folder, "pyperformance")
+        venv_python = os.path.join(venv, "Scripts" if self.settings.os == "Windows" else "bin", "python")
+        result = os.path.join(self.build_folder, "pyperformance.json")
+        self.run("{} -m venv \"{}\"".format(python, venv), run_environment=True)
+        self.run("\"{}\" -m pip install pyperformance".format(venv_python), run_environment=True)
+        self.run("\"{}\" -m pyperformance run --fast --python=\"{}\" -b {} -o \"{}\"".format(venv_python, python, benchmarks, result), run_environment=True)
+        self.output.info("pyperformance results written to {}".format(result))
+        baseline = tools.get_env("CPYTHON_BENCHMARK_BASELINE")
+        if baseline:
+            self.run("\"{}\" -m pyperformance compare \"{}\" \"{}\"".format(venv_python, baseline, result), run_environment=True)
+
     def test(self):
         if not tools.cross_building(self, skip_x64_x86=True):
             self.run("{} -c \"print('hello world')\"".format(self.deps_user_info["cpython"].python), run_environment=True)
@@ -190,3 +208,5 @@ class TestPackageConan(ConanFile):
             # MSVC builds need PYTHONHOME set.
             with tools.environment_append({"PYTHONHOME": self.deps_user_info["cpython"].pythonhome}) if self.deps_user_info["cpython"].module_requires_pythonhome == "True" else tools.no_op():
                 self.run(os.path.join("bin", "test_package"), run_environment=True)
+
+            self._run_benchmark()
@@ -1,7 +1,8 @@
 from conan.tools.microsoft import msvc_runtime_flag
 from conans import ConanFile, tools, AutoToolsBuildEnvironment
-from conans.errors import ConanInvalidConfiguration
+from conans.errors import ConanException, ConanInvalidConfiguration
 import glob
+import json
 import os
 import shutil
 
@@ -26,6 +27,8 @@ class ICUBase(ConanFile):
         "silent": [True, False],
         "with_dyload": [True, False],
         "dat_package_file": "ANY",
+        "data_filter_file": "ANY",
+        "data_filter_locales": "ANY",
         "with_icuio": [True, False],
         "with_extras": [True, False],
     }
@@ -37,6 +40,8 @@ class ICUBase(ConanFile):
         "silent": True,
         "with_dyload": True,
         "dat_package_file": None,
+        "data_filter_file": None,
+        "data_filter_locales": None,
         "with_icuio": True,
         "with_extras": False,
     }
@@ -47,6 +52,10 @@ class ICUBase(ConanFile):
     def _source_subfolder(self):
         return "source_subfolder"
 
+    @property
+    def _data_subfolder(self):
+        return "data_subfolder"
+
     @property
     def _is_msvc(self):
         return str(self.settings.compiler) in ["Visual Studio", "msvc"]
@@ -81,6 +90,10 @@ class ICUBase(ConanFile):
             raise ConanInvalidConfiguration(
                 "Compiling ICU for {} with {} not supported yet".format(str(self.settings.os),
                                                                         str(self.settings.compiler)))
+        if self.options.data_filter_file and self.options.data_filter_locales:
+            raise ConanInvalidConfiguration("data_filter_file and data_filter_locales can't be used together")
+        if self.options.dat_package_file and (self.options.data_filter_file or self.options.data_filter_locales):
+            raise ConanInvalidConfiguration("A prebuilt dat_package_file can't be filtered, data_filter_* options require building the data")
 
     @property
     def _platform(self):
@@ -110,6 +123,9 @@ class ICUBase(ConanFile):
         if self.info.options.dat_package_file:
             dat_package_file_sha256 = tools.sha256sum(str(self.info.options.dat_package_file))
             self.info.options.dat_package_file = dat_package_file_sha256
+        if self.info.options.data_filter_file:
+            data_filter_file_sha256 = tools.sha256sum(str(self.info.options.data_filter_file))
+            self.info.options.data_filter_file = data_filter_file_sha256
 
     @property
     def _settings_build(self):
@@ -123,7 +139,10 @@ class ICUBase(ConanFile):
             self.build_requires("icu/{}".format(self.version))
 
     def source(self):
-        tools.get(**self.conan_data["sources"][self.version], strip_root=True, destination=self._source_subfolder)
+        tools.get(**self.conan_data["sources"][self.version][0], strip_root=True, destination=self._source_subfolder)
+        # Since ICU 64 the data sources data_filter_* apply to are only shipped in icu4c-XX-data.zip,
+        # the src archive has the prebuilt data archive only
+        tools.get(**self.conan_data["sources"][self.version][1], destination=self._data_subfolder)
 
     def build(self):
         self._patch_sources()
@@ -134,6 +153,13 @@ class ICUBase(ConanFile):
                 shutil.copy(str(self.options.dat_package_file), dat_package_file[0])
 
         env_build = self._configure_autotools()
+        if self._data_filter_file:
+            # The data is built by the python data build tool of ICU instead of make alone
+            if "PYTHON" not in env_build.vars and not tools.which("python3"):
+                raise ConanException("data_filter_file and data_filter_locales require python 3 in PATH to build the ICU data")
+            self._write_data_filter()
+            self._use_data_sources()
+
         build_dir = os.path.join(self.build_folder, self._source_subfolder, "build")
         os.mkdir(build_dir)
         with tools.vcvars(self.settings) if self._is_msvc else tools.no_op():
@@ -144,7 +170,8 @@ class ICUBase(ConanFile):
                     # workaround for "No rule to make target 'out/tmp/dirs.timestamp'"
                     tools.save(os.path.join("data", "out", "tmp", "dirs.timestamp"), "")
 
-                    self.run(self._build_config_cmd, win_bash=tools.os_info.is_windows)
+                    with tools.environment_append(self._data_filter_env):
+                        self.run(self._build_config_cmd, win_bash=tools.os_info.is_windows)
                     command = "{make} {silent} -j {cpu_count}".format(make=self._make_tool,
                                                                       silent=self._silent,
                                                                       cpu_count=tools.cpu_count())
@@ -154,6 +181,36 @@ class ICUBase(ConanFile):
                                                                  silent=self._silent)
                         self.run(command, win_bash=tools.os_info.is_windows)
 
+    @property
+    def _data_filter_file(self):
+        if self.options.data_filter_file:
+            return str(self.options.data_filter_file)
+        if self.options.data_filter_locales:
+            return os.path.join(self.build_folder, "data_filter.json")
+        return None
+
+    @property
+    def _data_filter_env(self):
+        # http://userguide.icu-project.org/icudata#TOC-ICU-Data-Build-Tool
+        if not self._data_filter_file:
+            return {}
+        return {"ICU_DATA_FILTER_FILE": self._data_filter_file.replace("\\", "/")}
+
+    def _write_data_filter(self):
+        if self.options.data_filter_locales:
+            locales = [locale.strip() for locale in str(self.options.data_filter_locales).split(",") if locale.strip()]
+            # ICU 67 renamed whitelist to includelist
+            list_key = "whitelist" if tools.Version(self.version) < "67" else "includelist"
+            locale_filter = {"filterType": "locale", list_key: locales}
+            tools.save(self._data_filter_file, json.dumps({"localeFilter": locale_filter}, indent=2))
+
+    def _use_data_sources(self):
+        # The sources are copied to the build folder, so this only changes the data of this configuration
+        self.copy("*", src=os.path.join(self._data_subfolder, "data"), dst=os.path.join(self._source_subfolder, "source", "data"))
+        # configure only builds the data from its sources if there is no prebuilt data archive
+        for dat_file in glob.glob(os.path.join(self.source_folder, self._source_subfolder, "source", "data", "in", "*.dat")):
+            os.remove(dat_file)
+
     def _patch_sources(self):
         for patch in self.conan_data.get("patches", {}).get(self.version, []):
             tools.patch(**patch)
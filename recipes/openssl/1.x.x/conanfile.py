@@ -5,7 +5,9 @@ from conans import ConanFile, AutoToolsBuildEnvironment, tools
 from contextlib import contextmanager
 from functools import total_ordering
 import fnmatch
+import json
 import os
+import re
 import textwrap
 
 required_conan_version = ">=1.43.0"
@@ -80,6 +82,7 @@ class OpenSSLConan(ConanFile):
         "no_asm": [True, False],
         "enable_weak_ssl_ciphers": [True, False],
         "386": [True, False],
+        "build_libs": [True, False],
         "no_stdio": [True, False],
         "no_tests": [True, False],
         "no_sse2": [True, False],
@@ -213,6 +216,7 @@ class OpenSSLConan(ConanFile):
             del self.options.no_whirlpool
 
         if self._full_version < "1.1.1":
+            del self.options.build_libs
             del self.options.no_aria
             del self.options.no_pinshared
             del self.options.no_sm2
@@ -564,7 +568,7 @@ class OpenSSLConan(ConanFile):
 
         for option_name in self.options.values.fields:
             activated = getattr(self.options, option_name)
-            if activated and option_name not in ["fPIC", "openssldir", "capieng_dialog", "enable_capieng"]:
+            if activated and option_name not in ["fPIC", "openssldir", "capieng_dialog", "enable_capieng", "build_libs"]:
                 self.output.info("activated option: %s" % option_name)
                 args.append(option_name.replace("_", "-"))
         return args
@@ -712,7 +716,21 @@ class OpenSSLConan(ConanFile):
 
                 self._run_make(makefile=self._nmake_makefile)
             else:
-                self._run_make()
+                self._run_make(targets=self._build_targets)
+
+    @property
+    def _build_targets(self):
+        # The default target also builds the openssl application, which consumers only linking
+        # against the libraries don't need
+        if self.options.get_safe("build_libs"):
+            return ["build_libs", "build_engines"]
+        return None
+
+    @property
+    def _install_targets(self):
+        if self.options.get_safe("build_libs"):
+            return ["install_dev", "install_engines", "install_runtime_libs"]
+        return ["install_sw"]
 
     def _make_install(self):
         with tools.chdir(self._source_subfolder):
@@ -723,7 +741,55 @@ class OpenSSLConan(ConanFile):
             if self._use_nmake and self._full_version < "1.1.0":
                 self._run_make(makefile=self._nmake_makefile, targets=["install"], parallel=False)
             else:
-                self._run_make(targets=["install_sw"], parallel=False)
+                # install_sw only supports parallel jobs since 1.1.1
+                self._run_make(targets=self._install_targets, parallel=self._full_version >= "1.1.1")
+
+    @property
+    def _asm_info_rel_path(self):
+        return os.path.join("res", "openssl-asm.json")
+
+    @staticmethod
+    def _configdata_defines(content):
+        # The define lists Configure hands to the compiler: "defines"/"lib_defines" of %config and
+        # %target, and the per library "defines" of %unified_info. Other mentions of the *_ASM
+        # names in configdata.pm (source lists, perl code) don't say whether they are built.
+        defines = []
+        for match in re.finditer(r'"(?:lib_)?defines"\s*=>\s*[\[{]', content):
+            depth = 0
+            for end in range(match.end() - 1, len(content)):
+                if content[end] in "[{":
+                    depth += 1
+                elif content[end] in "]}":
+                    depth -= 1
+                    if depth == 0:
+                        break
+            defines.extend(re.findall(r'"([^"]*)"', content[match.end():end]))
+        return defines
+
+    def _asm_info(self):
+        # Accelerated code paths enabled by Configure: the perlasm flavour of the generated
+        # assembler and the *_ASM defines selecting it in libcrypto. With OPENSSL_CPUID_OBJ the
+        # implementation is still chosen at runtime from the CPU capabilities, which can be
+        # masked with the OPENSSL_ia32cap (x86) or OPENSSL_armcap (ARM) environment variables.
+        configdata = os.path.join(self._source_subfolder, "configdata.pm")
+        if os.path.isfile(configdata):
+            content = tools.load(configdata)
+            scheme = re.search(r'"?perlasm_scheme"?\s*=>\s*"([^"]*)"', content)
+            defines = self._configdata_defines(content)
+        elif os.path.isfile(os.path.join(self._source_subfolder, "Makefile")):
+            # 1.0.x has no configdata.pm, Configure writes everything to the Makefile
+            content = tools.load(os.path.join(self._source_subfolder, "Makefile"))
+            scheme = re.search(r"^PERLASM_SCHEME\s*=[ \t]*(\S*)", content, re.MULTILINE)
+            cflag = re.search(r"^CFLAG\s*=(.*)$", content, re.MULTILINE)
+            defines = [t[2:] for t in cflag.group(1).split() if t.startswith("-D")] if cflag else []
+        else:
+            return {"perlasm_scheme": "", "asm_defines": []}
+        defines = sorted(set(d.split("=")[0] for d in defines if "NO_" not in d and
+                             re.match(r"(OPENSSL_CPUID_OBJ|OPENSSL_IA32_SSE2|[A-Z0-9_]+_ASM(_\w+)?)(=|$)", d)))
+        return {
+            "perlasm_scheme": scheme.group(1) if scheme and defines else "",
+            "asm_defines": defines,
+        }
 
     @property
     def _cc(self):
@@ -830,6 +896,11 @@ class OpenSSLConan(ConanFile):
                 if file.endswith(".a"):
                     os.unlink(os.path.join(libdir, file))
 
+        asm_info = self._asm_info()
+        if not self.options.no_asm and not asm_info["asm_defines"]:
+            self.output.warn("No assembler implementation was enabled, libcrypto will only use its C code paths")
+        tools.save(os.path.join(self.package_folder, self._asm_info_rel_path), json.dumps(asm_info, indent=1))
+
         tools.rmdir(os.path.join(self.package_folder, "lib", "pkgconfig"))
 
         self._create_cmake_module_variables(
@@ -911,6 +982,12 @@ class OpenSSLConan(ConanFile):
             self.cpp_info.components["crypto"].system_libs.append("atomic")
             self.cpp_info.components["ssl"].system_libs.append("atomic")
 
+        asm_info_file = os.path.join(self.package_folder, self._asm_info_rel_path)
+        if os.path.isfile(asm_info_file):
+            asm_info = json.loads(tools.load(asm_info_file))
+            self.user_info.perlasm_scheme = asm_info["perlasm_scheme"]
+            self.user_info.asm_defines = " ".join(asm_info["asm_defines"])
+
         # TODO: to remove in conan v2 once cmake_find_package* generators removed
         self.cpp_info.names["cmake_find_package"] = "OpenSSL"
         self.cpp_info.names["cmake_find_package_multi"] = "OpenSSL"
@@ -1,4 +1,5 @@
 from conans import CMake, tools, ConanFile
+from conans.errors import ConanException
 import os
 
 
@@ -31,8 +32,34 @@ class TestPackageConan(ConanFile):
             cmake.configure()
             cmake.build()
 
+    def _run_benchmark(self):
+        # Opt-in with OPENSSL_BENCHMARK=1: reports the assembler code paths compiled into the package
+        # and measures them with `openssl speed`, so that a silent fallback to C shows up
+        if not tools.get_env("OPENSSL_BENCHMARK") or self.options["openssl"].no_stdio:
+            return
+        if "build_libs" in self.options["openssl"] and self.options["openssl"].build_libs:
+            return
+        openssl_info = self.deps_user_info["openssl"]
+        asm_defines = getattr(openssl_info, "asm_defines", None)
+        self.output.info("perlasm scheme: {}".format(getattr(openssl_info, "perlasm_scheme", None) or "none"))
+        self.output.info("assembler modules: {}".format(asm_defines or "none"))
+        if asm_defines == "" and not self.options["openssl"].no_asm:
+            raise ConanException("openssl was built without any assembler implementation")
+        openssl_version = tools.Version(self.deps_cpp_info["openssl"].version)
+        if openssl_version < "1.1.1":
+            speed, algorithms = "openssl speed", ("aes-128-gcm", "sha256")
+        else:
+            speed, algorithms = "openssl speed -seconds 1", ("aes-128-gcm", "chacha20-poly1305", "sha256")
+        for algorithm in algorithms:
+            self.run("{} -evp {}".format(speed, algorithm), run_environment=True)
+        if self.settings.arch in ("x86", "x86_64"):
+            # Masking AES-NI and PCLMULQDQ gives the throughput of the fallback implementation
+            with tools.environment_append({"OPENSSL_ia32cap": "~0x200000200000000"}):
+                self.run("{} -evp aes-128-gcm".format(speed), run_environment=True)
+
     def test(self):
         if not self._skip_test and not tools.cross_building(self):
             bin_path = os.path.join("bin", "digest")
             self.run(bin_path, run_environment=True)
+            self._run_benchmark()
         assert os.path.exists(os.path.join(self.deps_cpp_info["openssl"].rootpath, "licenses", "LICENSE"))
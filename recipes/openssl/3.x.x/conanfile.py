@@ -3,7 +3,9 @@ from conans.errors import ConanInvalidConfiguration
 import contextlib
 import fnmatch
 import functools
+import json
 import os
+import re
 import textwrap
 
 required_conan_version = ">=1.43.0"
@@ -22,6 +24,7 @@ class OpenSSLConan(ConanFile):
         "fPIC": [True, False],
         "enable_weak_ssl_ciphers": [True, False],
         "386": [True, False],
+        "build_libs": [True, False],
         "capieng_dialog": [True, False],
         "enable_capieng": [True, False],
         "no_aria": [True, False],
@@ -434,7 +437,7 @@ class OpenSSLConan(ConanFile):
             ])
 
         for option_name in self.options.values.fields:
-            if self.options.get_safe(option_name, False) and option_name not in ("shared", "fPIC", "openssldir", "capieng_dialog", "enable_capieng", "zlib", "no_fips"):
+            if self.options.get_safe(option_name, False) and option_name not in ("shared", "fPIC", "openssldir", "capieng_dialog", "enable_capieng", "zlib", "no_fips", "build_libs"):
                 self.output.info(f"Activated option: {option_name}")
                 args.append(option_name.replace("_", "-"))
         return args
@@ -560,7 +563,21 @@ class OpenSSLConan(ConanFile):
 
             self.run("{perl} ./Configure {args}".format(perl=self._perl, args=args), win_bash=self._win_bash)
 
-            self._run_make()
+            self._run_make(targets=self._build_targets)
+
+    @property
+    def _build_targets(self):
+        # The default target also builds the openssl application (and the fuzz and test programs
+        # unless disabled), which consumers only linking against the libraries don't need
+        if self.options.build_libs:
+            return ["build_libs", "build_engines", "build_modules"]
+        return None
+
+    @property
+    def _install_targets(self):
+        if self.options.build_libs:
+            return ["install_dev", "install_engines", "install_modules", "install_runtime_libs"]
+        return ["install_sw"]
 
     def _make_install(self):
         with tools.chdir(self._source_subfolder):
@@ -568,7 +585,47 @@ class OpenSSLConan(ConanFile):
             if not os.path.isdir(os.path.join(self.package_folder, "bin")):
                 os.makedirs(os.path.join(self.package_folder, "bin"))
 
-            self._run_make(targets=["install_sw"], parallel=False)
+            self._run_make(targets=self._install_targets)
+
+    @property
+    def _asm_info_rel_path(self):
+        return os.path.join("res", "openssl-asm.json")
+
+    @staticmethod
+    def _configdata_defines(content):
+        # The define lists Configure hands to the compiler: "defines"/"lib_defines" of %config and
+        # %target, and the per library "defines" of %unified_info. Other mentions of the *_ASM
+        # names in configdata.pm (source lists, perl code) don't say whether they are built.
+        defines = []
+        for match in re.finditer(r'"(?:lib_)?defines"\s*=>\s*[\[{]', content):
+            depth = 0
+            for end in range(match.end() - 1, len(content)):
+                if content[end] in "[{":
+                    depth += 1
+                elif content[end] in "]}":
+                    depth -= 1
+                    if depth == 0:
+                        break
+            defines.extend(re.findall(r'"([^"]*)"', content[match.end():end]))
+        return defines
+
+    def _asm_info(self):
+        # Accelerated code paths enabled by Configure: the perlasm flavour of the generated
+        # assembler and the *_ASM defines selecting it in libcrypto. With OPENSSL_CPUID_OBJ the
+        # implementation is still chosen at runtime from the CPU capabilities, which can be
+        # masked with the OPENSSL_ia32cap (x86) or OPENSSL_armcap (ARM) environment variables.
+        configdata = os.path.join(self._source_subfolder, "configdata.pm")
+        if not os.path.isfile(configdata):
+            return {"perlasm_scheme": "", "asm_defines": []}
+        content = tools.load(configdata)
+        scheme = re.search(r'"?perlasm_scheme"?\s*=>\s*"([^"]*)"', content)
+        defines = self._configdata_defines(content)
+        defines = sorted(set(d.split("=")[0] for d in defines if "NO_" not in d and
+                             re.match(r"(OPENSSL_CPUID_OBJ|OPENSSL_IA32_SSE2|[A-Z0-9_]+_ASM(_\w+)?)(=|$)", d)))
+        return {
+            "perlasm_scheme": scheme.group(1) if scheme and defines else "",
+            "asm_defines": defines,
+        }
 
     @property
     def _cc(self):
@@ -673,6 +730,11 @@ class OpenSSLConan(ConanFile):
             else:
                 self.copy("fips.so", src=provdir,dst="lib/ossl-modules")
 
+        asm_info = self._asm_info()
+        if not self.options.no_asm and not asm_info["asm_defines"]:
+            self.output.warn("No assembler implementation was enabled, libcrypto will only use its C code paths")
+        tools.save(os.path.join(self.package_folder, self._asm_info_rel_path), json.dumps(asm_info, indent=1))
+
         tools.rmdir(os.path.join(self.package_folder, "lib", "pkgconfig"))
 
         self._create_cmake_module_variables(
@@ -766,3 +828,9 @@ class OpenSSLConan(ConanFile):
         self.cpp_info.components["crypto"].names["cmake_find_package_multi"] = "Crypto"
         self.cpp_info.components["ssl"].names["cmake_find_package"] = "SSL"
         self.cpp_info.components["ssl"].names["cmake_find_package_multi"] = "SSL"
+
+        asm_info_file = os.path.join(self.package_folder, self._asm_info_rel_path)
+        if os.path.isfile(asm_info_file):
+            asm_info = json.loads(tools.load(asm_info_file))
+            self.user_info.perlasm_scheme = asm_info["perlasm_scheme"]
+            self.user_info.asm_defines = " ".join(asm_info["asm_defines"])
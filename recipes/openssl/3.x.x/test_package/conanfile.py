@@ -1,4 +1,5 @@
 from conans import CMake, tools, ConanFile
+from conans.errors import ConanException
 import os
 
 
@@ -14,13 +15,35 @@ class TestPackageConan(ConanFile):
         cmake.configure()
         cmake.build()
 
+    def _run_benchmark(self):
+        # Opt-in with OPENSSL_BENCHMARK=1: reports the assembler code paths compiled into the package
+        # and measures them with `openssl speed`, so that a silent fallback to C shows up
+        if not tools.get_env("OPENSSL_BENCHMARK") or self.options["openssl"].no_stdio or self.options["openssl"].build_libs:
+            return
+        openssl_info = self.deps_user_info["openssl"]
+        asm_defines = getattr(openssl_info, "asm_defines", None)
+        self.output.info("perlasm scheme: {}".format(getattr(openssl_info, "perlasm_scheme", None) or "none"))
+        self.output.info("assembler modules: {}".format(asm_defines or "none"))
+        if asm_defines == "" and not self.options["openssl"].no_asm:
+            raise ConanException("openssl was built without any assembler implementation")
+        # CPU capabilities detected at runtime, which select the implementation (see OPENSSL_ia32cap)
+        self.run("openssl version -c", run_environment=True)
+        for algorithm in ("aes-128-gcm", "chacha20-poly1305", "sha256"):
+            self.run("openssl speed -seconds 1 -evp {}".format(algorithm), run_environment=True)
+        if self.settings.arch in ("x86", "x86_64"):
+            # Masking AES-NI and PCLMULQDQ gives the throughput of the fallback implementation
+            with tools.environment_append({"OPENSSL_ia32cap": "~0x200000200000000"}):
+                self.run("openssl speed -seconds 1 -evp aes-128-gcm", run_environment=True)
+
     def test(self):
         if not tools.cross_building(self):
             bin_path = os.path.join("bin", "digest")
             self.run(bin_path, run_environment=True)
 
-            if not self.options["openssl"].no_stdio:
+            if not self.options["openssl"].no_stdio and not self.options["openssl"].build_libs:
                 self.run("openssl version", run_environment=True)
+
+            self._run_benchmark()
         assert os.path.exists(os.path.join(self.deps_cpp_info["openssl"].rootpath, "licenses", "LICENSE.txt"))
 
         for fn in ("libcrypto.pc", "libssl.pc", "openssl.pc",):
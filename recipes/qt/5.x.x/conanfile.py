@@ -2,9 +2,12 @@ from conan.tools.microsoft import msvc_runtime_flag
 from conans import ConanFile, tools, RunEnvironment
 from conans.errors import ConanInvalidConfiguration
 from conans.model import Generator
+import collections
 import configparser
+import fnmatch
 import glob
 import itertools
+import json
 import os
 import textwrap
 
@@ -33,6 +36,39 @@ Documentation = bin/datadir/doc
 Examples = bin/datadir/examples""" % self.conanfile.deps_cpp_info["qt"].rootpath.replace("\\", "/")
 
 
+class _QtComponent(object):
+    """cpp_info fields of a component, as resolved by QtConan._component_graph(), in a JSON friendly form."""
+
+    list_fields = ["libs", "libdirs", "includedirs", "builddirs", "defines", "requires", "system_libs",
+                   "frameworks", "cxxflags", "exelinkflags", "sharedlinkflags"]
+    # Defaults of the cpp_info components of a recipe without layout(), fields left to them are not stored
+    _defaults = {"includedirs": ["include"], "libdirs": ["lib"], "builddirs": [""]}
+
+    def __init__(self):
+        for field in self.list_fields:
+            setattr(self, field, list(self._defaults.get(field, [])))
+        self.objects = []  # relative to the package folder, added to the link flags by package_info()
+        self.names = {}
+        self.build_modules = collections.defaultdict(list)
+        self.properties = {}
+
+    def set_property(self, name, value):
+        self.properties[name] = value
+
+    def serialize(self):
+        fields = {f: getattr(self, f) for f in self.list_fields if getattr(self, f) != self._defaults.get(f, [])}
+        for field in ["objects", "names", "build_modules", "properties"]:
+            if getattr(self, field):
+                fields[field] = getattr(self, field)
+        return fields
+
+
+class _QtComponents(dict):
+    def __missing__(self, name):
+        component = self[name] = _QtComponent()
+        return component
+
+
 class QtConan(ConanFile):
     _submodules = ["qtsvg", "qtdeclarative", "qtactiveqt", "qtscript", "qtmultimedia", "qttools", "qtxmlpatterns",
     "qttranslations", "qtdoc", "qtlocation", "qtsensors", "qtconnectivity", "qtwayland",
@@ -85,7 +121,10 @@ class QtConan(ConanFile):
         "cross_compile": "ANY",
         "sysroot": "ANY",
         "config": "ANY",
-        "multiconfiguration": [True, False]
+        "multiconfiguration": [True, False],
+        "webengine_jobs": "ANY",  # parallel jobs of the chromium ninja build (NINJAFLAGS)
+        "webengine_memory_per_job": "ANY",  # MiB of RAM budgeted per chromium job, caps webengine_jobs
+        "webengine_jumbo_build": [True, False],
     }
     options.update({module: [True, False] for module in _submodules})
 
@@ -123,7 +162,10 @@ class QtConan(ConanFile):
         "cross_compile": None,
         "sysroot": None,
         "config": None,
-        "multiconfiguration": False
+        "multiconfiguration": False,
+        "webengine_jobs": None,
+        "webengine_memory_per_job": None,
+        "webengine_jumbo_build": True,
     }
     default_options.update({module: False for module in _submodules})
 
@@ -279,6 +321,11 @@ class QtConan(ConanFile):
                 _enablemodule(module)
 
     def validate(self):
+        for option in ("webengine_jobs", "webengine_memory_per_job"):
+            value = self.options.get_safe(option)
+            if value and (not str(value).isdigit() or int(str(value)) == 0):
+                raise ConanInvalidConfiguration("{} must be a positive integer".format(option))
+
         if self.settings.compiler.get_safe("cppstd"):
             tools.check_min_cppstd(self, "11")
         if self.options.widgets and not self.options.gui:
@@ -405,6 +452,54 @@ class QtConan(ConanFile):
                                   "  if (enable_precompiled_headers) {\n    if (false) {"
                                   )
 
+    @staticmethod
+    def _available_memory_mb():
+        """
+        obtain the physical memory available for new processes on the build machine
+        identical copies live in the boost, qt/5.x.x and qt/6.x.x recipes, a fix must be made to all of them
+        :return: available memory in MiB, or None if it can't be determined
+        """
+        try:
+            with open("/proc/meminfo") as meminfo:
+                for line in meminfo:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) // 1024
+        except (IOError, OSError, ValueError):
+            pass
+        try:
+            return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+        except (AttributeError, ValueError, OSError):
+            pass
+        if tools.os_info.is_windows:
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("sullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullAvailPhys // (1024 * 1024)
+        return None
+
+    @property
+    def _webengine_jobs(self):
+        """
+        number of parallel jobs of the chromium ninja build, None to let ninja decide
+        """
+        jobs = int(str(self.options.webengine_jobs)) if self.options.webengine_jobs else None
+        if self.options.webengine_memory_per_job:
+            available = self._available_memory_mb()
+            if available is None:
+                self.output.warn("Unable to determine the available memory, webengine_memory_per_job is ignored")
+            else:
+                jobs = max(1, min(jobs or tools.cpu_count(), available // int(str(self.options.webengine_memory_per_job))))
+        return jobs
+
     def _make_program(self):
         if self._is_msvc:
             return "jom"
@@ -711,6 +806,10 @@ class QtConan(ConanFile):
             args += ["-qt-webengine-ffmpeg",
                      "-system-webengine-opus"]
 
+        if self.options.qtwebengine and not self.options.webengine_jumbo_build:
+            # webengine-jumbo-build is enabled by default in src/core/configure.json
+            args.append("-no-feature-webengine-jumbo-build")
+
         if self.options.config:
             args.append(str(self.options.config))
 
@@ -718,6 +817,8 @@ class QtConan(ConanFile):
         with tools.chdir("build_folder"):
             with tools.vcvars(self) if self._is_msvc else tools.no_op():
                 build_env = {"MAKEFLAGS": "j%d" % tools.cpu_count(), "PKG_CONFIG_PATH": [self.build_folder]}
+                if self.options.qtwebengine and self._webengine_jobs:
+                    build_env["NINJAFLAGS"] = "-j%d" % self._webengine_jobs
                 if self.settings.os == "Windows":
                     build_env["PATH"] = [os.path.join(self.source_folder, "qt5", "gnuwin32", "bin")]
 
@@ -739,9 +840,29 @@ class QtConan(ConanFile):
     def _cmake_core_extras_file(self):
         return os.path.join("lib", "cmake", "Qt5Core", "conan_qt_core_extras.cmake")
 
+    @property
+    def _components_file(self):
+        return os.path.join("lib", "cmake", "Qt5Core", "conan_qt_components.json")
+
+    @property
+    def _recipe_sha256(self):
+        # The stored component graph is only valid for the recipe that resolved it
+        return tools.sha256sum(os.path.abspath(__file__))
+
     def _cmake_qt5_private_file(self, module):
         return os.path.join("lib", "cmake", "Qt5{0}".format(module), "conan_qt_qt5_{0}private.cmake".format(module.lower()))
 
+    def _remove_files_by_masks(self, masks):
+        # Single walk of the package folder for all the (subfolder, mask) pairs, the installed tree is large
+        for root, _, files in os.walk(self.package_folder):
+            relroot = os.path.relpath(root, self.package_folder).replace(os.sep, "/")
+            for subfolder, mask in masks:
+                if subfolder and relroot != subfolder and not relroot.startswith(subfolder + "/"):
+                    continue
+                for name in fnmatch.filter(files, mask):
+                    if os.path.isfile(os.path.join(root, name)):
+                        os.remove(os.path.join(root, name))
+
     def package(self):
         with tools.chdir("build_folder"):
             self.run("%s install" % self._make_program())
@@ -763,11 +884,14 @@ Examples = bin/datadir/examples""")
             if not self.options.get_safe(module):
                 tools.rmdir(os.path.join(self.package_folder, "licenses", module))
         tools.rmdir(os.path.join(self.package_folder, "lib", "pkgconfig"))
-        for mask in ["Find*.cmake", "*Config.cmake", "*-config.cmake"]:
-            tools.remove_files_by_mask(self.package_folder, mask)
-        tools.remove_files_by_mask(os.path.join(self.package_folder, "lib"), "*.la*")
-        tools.remove_files_by_mask(os.path.join(self.package_folder, "lib"), "*.pdb*")
-        tools.remove_files_by_mask(os.path.join(self.package_folder, "bin"), "*.pdb")
+        self._remove_files_by_masks([
+            ("", "Find*.cmake"),
+            ("", "*Config.cmake"),
+            ("", "*-config.cmake"),
+            ("lib", "*.la*"),
+            ("lib", "*.pdb*"),
+            ("bin", "*.pdb"),
+        ])
         # "Qt5Bootstrap" is internal Qt library - removing it to avoid linking error, since it contains
         # symbols that are also in "Qt5Core.lib". It looks like there is no "Qt5Bootstrap.dll".
         for fl in glob.glob(os.path.join(self.package_folder, "lib", "*Qt5Bootstrap*")):
@@ -863,9 +987,17 @@ Examples = bin/datadir/examples""")
         if self.options.qtdeclarative:
             _create_private_module("Qml", ["CorePrivate", "Qml"])
 
+        # package_info() runs for every consumer, it only has to load the graph resolved here
+        graph = self._component_graph(self.package_folder)
+        graph["recipe_sha256"] = self._recipe_sha256
+        tools.save(os.path.join(self.package_folder, self._components_file), json.dumps(graph, indent=1))
+
     def package_id(self):
         del self.info.options.cross_compile
         del self.info.options.sysroot
+        del self.info.options.webengine_jobs
+        del self.info.options.webengine_memory_per_job
+        del self.info.options.webengine_jumbo_build
         if self.options.multiconfiguration and self._is_msvc:
             if self.settings.compiler == "Visual Studio":
                 if "MD" in self.settings.compiler.runtime:
@@ -875,12 +1007,9 @@ Examples = bin/datadir/examples""")
             else:
                 self.info.settings.compiler.runtime_type = "Release/Debug"
 
-    def package_info(self):
-        self.cpp_info.set_property("cmake_file_name", "Qt5")
-
-        self.cpp_info.names["cmake_find_package"] = "Qt5"
-        self.cpp_info.names["cmake_find_package_multi"] = "Qt5"
-
+    def _component_graph(self, package_folder):
+        """Resolves the components, plugins and cmake build modules of the package installed in package_folder."""
+        components = _QtComponents()
         build_modules = []
 
         libsuffix = ""
@@ -899,34 +1028,34 @@ Examples = bin/datadir/examples""")
 
         def _create_module(module, requires=[]):
             componentname = "qt%s" % module
-            assert componentname not in self.cpp_info.components, "Module %s already present in self.cpp_info.components" % module
-            self.cpp_info.components[componentname].set_property("cmake_target_name", "Qt5::{}".format(module))
-            self.cpp_info.components[componentname].names["cmake_find_package"] = module
-            self.cpp_info.components[componentname].names["cmake_find_package_multi"] = module
+            assert componentname not in components, "Module %s already present in components" % module
+            components[componentname].set_property("cmake_target_name", "Qt5::{}".format(module))
+            components[componentname].names["cmake_find_package"] = module
+            components[componentname].names["cmake_find_package_multi"] = module
             if module.endswith("Private"):
                 libname = module[:-7]
             else:
                 libname = module
-            self.cpp_info.components[componentname].libs = ["Qt5%s%s" % (libname, libsuffix)]
-            self.cpp_info.components[componentname].includedirs = ["include", os.path.join("include", "Qt%s" % module)]
-            self.cpp_info.components[componentname].defines = ["QT_%s_LIB" % module.upper()]
+            components[componentname].libs = ["Qt5%s%s" % (libname, libsuffix)]
+            components[componentname].includedirs = ["include", os.path.join("include", "Qt%s" % module)]
+            components[componentname].defines = ["QT_%s_LIB" % module.upper()]
             if module != "Core" and "Core" not in requires:
                 requires.append("Core")
-            self.cpp_info.components[componentname].requires = _get_corrected_reqs(requires)
+            components[componentname].requires = _get_corrected_reqs(requires)
 
         def _create_plugin(pluginname, libname, plugintype, requires):
             componentname = "qt%s" % pluginname
-            assert componentname not in self.cpp_info.components, "Plugin %s already present in self.cpp_info.components" % pluginname
-            self.cpp_info.components[componentname].set_property("cmake_target_name", "Qt5::{}".format(pluginname))
-            self.cpp_info.components[componentname].names["cmake_find_package"] = pluginname
-            self.cpp_info.components[componentname].names["cmake_find_package_multi"] = pluginname
+            assert componentname not in components, "Plugin %s already present in components" % pluginname
+            components[componentname].set_property("cmake_target_name", "Qt5::{}".format(pluginname))
+            components[componentname].names["cmake_find_package"] = pluginname
+            components[componentname].names["cmake_find_package_multi"] = pluginname
             if not self.options.shared:
-                self.cpp_info.components[componentname].libs = [libname + libsuffix]
-            self.cpp_info.components[componentname].libdirs = [os.path.join("bin", "archdatadir", "plugins", plugintype)]
-            self.cpp_info.components[componentname].includedirs = []
+                components[componentname].libs = [libname + libsuffix]
+            components[componentname].libdirs = [os.path.join("bin", "archdatadir", "plugins", plugintype)]
+            components[componentname].includedirs = []
             if "Core" not in requires:
                 requires.append("Core")
-            self.cpp_info.components[componentname].requires = _get_corrected_reqs(requires)
+            components[componentname].requires = _get_corrected_reqs(requires)
 
         core_reqs = ["zlib::zlib"]
         if self.options.with_pcre2:
@@ -944,12 +1073,12 @@ Examples = bin/datadir/examples""")
         if self.settings.os == "Windows":
             module = "WinMain"
             componentname = "qt%s" % module
-            self.cpp_info.components[componentname].set_property("cmake_target_name", "Qt5::{}".format(module))
-            self.cpp_info.components[componentname].names["cmake_find_package"] = module
-            self.cpp_info.components[componentname].names["cmake_find_package_multi"] = module
-            self.cpp_info.components[componentname].libs = ["qtmain%s" % libsuffix]
-            self.cpp_info.components[componentname].includedirs = []
-            self.cpp_info.components[componentname].defines = []
+            components[componentname].set_property("cmake_target_name", "Qt5::{}".format(module))
+            components[componentname].names["cmake_find_package"] = module
+            components[componentname].names["cmake_find_package_multi"] = module
+            components[componentname].libs = ["qtmain%s" % libsuffix]
+            components[componentname].includedirs = []
+            components[componentname].defines = []
 
         if self.options.gui:
             gui_reqs = []
@@ -977,23 +1106,23 @@ Examples = bin/datadir/examples""")
                 gui_reqs.append("libjpeg::libjpeg")
             _create_module("Gui", gui_reqs)
             build_modules.append(self._cmake_qt5_private_file("Gui"))
-            self.cpp_info.components["qtGui"].build_modules["cmake_find_package"].append(self._cmake_qt5_private_file("Gui"))
-            self.cpp_info.components["qtGui"].build_modules["cmake_find_package_multi"].append(self._cmake_qt5_private_file("Gui"))
+            components["qtGui"].build_modules["cmake_find_package"].append(self._cmake_qt5_private_file("Gui"))
+            components["qtGui"].build_modules["cmake_find_package_multi"].append(self._cmake_qt5_private_file("Gui"))
 
             if self.settings.os == "Windows":
                 _create_plugin("QWindowsIntegrationPlugin", "qwindows", "platforms", ["Core", "Gui"])
-                self.cpp_info.components["qtQWindowsIntegrationPlugin"].system_libs = ["advapi32", "dwmapi", "gdi32", "imm32",
+                components["qtQWindowsIntegrationPlugin"].system_libs = ["advapi32", "dwmapi", "gdi32", "imm32",
                     "ole32", "oleaut32", "shell32", "shlwapi", "user32", "winmm", "winspool", "wtsapi32"]
             elif self.settings.os == "Android":
                 _create_plugin("QAndroidIntegrationPlugin", "qtforandroid", "platforms", ["Core", "Gui"])
-                self.cpp_info.components["qtQAndroidIntegrationPlugin"].system_libs = ["android", "jnigraphics"]
+                components["qtQAndroidIntegrationPlugin"].system_libs = ["android", "jnigraphics"]
             elif self.settings.os == "Macos":
                 _create_plugin("QCocoaIntegrationPlugin", "qcocoa", "platforms", ["Core", "Gui"])
-                self.cpp_info.components["QCocoaIntegrationPlugin"].frameworks = ["AppKit", "Carbon", "CoreServices", "CoreVideo",
+                components["QCocoaIntegrationPlugin"].frameworks = ["AppKit", "Carbon", "CoreServices", "CoreVideo",
                     "IOKit", "IOSurface", "Metal", "QuartzCore"]
             elif self.settings.os in ["iOS", "tvOS"]:
                 _create_plugin("QIOSIntegrationPlugin", "qios", "platforms", [])
-                self.cpp_info.components["QIOSIntegrationPlugin"].frameworks = ["AudioToolbox", "Foundation", "Metal",
+                components["QIOSIntegrationPlugin"].frameworks = ["AudioToolbox", "Foundation", "Metal",
                     "QuartzCore", "UIKit"]
             elif self.settings.os == "watchOS":
                 _create_plugin("QMinimalIntegrationPlugin", "qminimal", "platforms", [])
@@ -1021,8 +1150,8 @@ Examples = bin/datadir/examples""")
         if self.options.widgets:
             _create_module("Widgets", ["Gui"])
             build_modules.append(self._cmake_qt5_private_file("Widgets"))
-            self.cpp_info.components["qtWidgets"].build_modules["cmake_find_package"].append(self._cmake_qt5_private_file("Widgets"))
-            self.cpp_info.components["qtWidgets"].build_modules["cmake_find_package_multi"].append(self._cmake_qt5_private_file("Widgets"))
+            components["qtWidgets"].build_modules["cmake_find_package"].append(self._cmake_qt5_private_file("Widgets"))
+            components["qtWidgets"].build_modules["cmake_find_package_multi"].append(self._cmake_qt5_private_file("Widgets"))
         if self.options.gui and self.options.widgets:
             _create_module("PrintSupport", ["Gui", "Widgets"])
         if self.options.get_safe("opengl", "no") != "no" and self.options.gui:
@@ -1037,13 +1166,13 @@ Examples = bin/datadir/examples""")
         if self.options.qtdeclarative:
             _create_module("Qml", ["Network"])
             build_modules.append(self._cmake_qt5_private_file("Qml"))
-            self.cpp_info.components["qtQml"].build_modules["cmake_find_package"].append(self._cmake_qt5_private_file("Qml"))
-            self.cpp_info.components["qtQml"].build_modules["cmake_find_package_multi"].append(self._cmake_qt5_private_file("Qml"))
+            components["qtQml"].build_modules["cmake_find_package"].append(self._cmake_qt5_private_file("Qml"))
+            components["qtQml"].build_modules["cmake_find_package_multi"].append(self._cmake_qt5_private_file("Qml"))
             _create_module("QmlModels", ["Qml"])
-            self.cpp_info.components["qtQmlImportScanner"].set_property("cmake_target_name", "Qt5::QmlImportScanner")
-            self.cpp_info.components["qtQmlImportScanner"].names["cmake_find_package"] = "QmlImportScanner" # this is an alias for Qml and there to integrate with existing consumers
-            self.cpp_info.components["qtQmlImportScanner"].names["cmake_find_package_multi"] = "QmlImportScanner"
-            self.cpp_info.components["qtQmlImportScanner"].requires = _get_corrected_reqs(["Qml"])
+            components["qtQmlImportScanner"].set_property("cmake_target_name", "Qt5::QmlImportScanner")
+            components["qtQmlImportScanner"].names["cmake_find_package"] = "QmlImportScanner" # this is an alias for Qml and there to integrate with existing consumers
+            components["qtQmlImportScanner"].names["cmake_find_package_multi"] = "QmlImportScanner"
+            components["qtQmlImportScanner"].requires = _get_corrected_reqs(["Qml"])
             if self.options.gui:
                 _create_module("Quick", ["Gui", "Qml", "QmlModels"])
                 if self.options.widgets:
@@ -1053,12 +1182,12 @@ Examples = bin/datadir/examples""")
             _create_module("QuickTest", ["Test"])
 
         if self.options.qttools and self.options.gui and self.options.widgets:
-            self.cpp_info.components["qtLinguistTools"].set_property("cmake_target_name", "Qt5::LinguistTools")
-            self.cpp_info.components["qtLinguistTools"].names["cmake_find_package"] = "LinguistTools"
-            self.cpp_info.components["qtLinguistTools"].names["cmake_find_package_multi"] = "LinguistTools"
+            components["qtLinguistTools"].set_property("cmake_target_name", "Qt5::LinguistTools")
+            components["qtLinguistTools"].names["cmake_find_package"] = "LinguistTools"
+            components["qtLinguistTools"].names["cmake_find_package_multi"] = "LinguistTools"
             _create_module("UiPlugin", ["Gui", "Widgets"])
-            self.cpp_info.components["qtUiPlugin"].libs = [] # this is a collection of abstract classes, so this is header-only
-            self.cpp_info.components["qtUiPlugin"].libdirs = []
+            components["qtUiPlugin"].libs = [] # this is a collection of abstract classes, so this is header-only
+            components["qtUiPlugin"].libdirs = []
             _create_module("UiTools", ["UiPlugin", "Gui", "Widgets"])
             _create_module("Designer", ["Gui", "UiPlugin", "Widgets", "Xml"])
             _create_module("Help", ["Gui", "Sql", "Widgets"])
@@ -1212,7 +1341,7 @@ Examples = bin/datadir/examples""")
             _create_module("NetworkAuth", ["Network"])
 
         if self.settings.os != "Windows":
-            self.cpp_info.components["qtCore"].cxxflags.append("-fPIC")
+            components["qtCore"].cxxflags.append("-fPIC")
 
         if self.options.get_safe("qtx11extras"):
             _create_module("X11Extras")
@@ -1231,15 +1360,15 @@ Examples = bin/datadir/examples""")
 
         if self.options.qtactiveqt:
             _create_module("AxBase", ["Gui", "Widgets"])
-            self.cpp_info.components["qtAxBase"].includedirs = ["include", os.path.join("include", "ActiveQt")]
-            self.cpp_info.components["qtAxBase"].system_libs.extend(["ole32", "oleaut32", "user32", "gdi32", "advapi32"])
+            components["qtAxBase"].includedirs = ["include", os.path.join("include", "ActiveQt")]
+            components["qtAxBase"].system_libs.extend(["ole32", "oleaut32", "user32", "gdi32", "advapi32"])
             if self.settings.compiler == "gcc":
-                self.cpp_info.components["qtAxBase"].system_libs.append("uuid")
+                components["qtAxBase"].system_libs.append("uuid")
             _create_module("AxContainer", ["Core", "Gui", "Widgets", "AxBase"])
-            self.cpp_info.components["qtAxContainer"].includedirs = [os.path.join("include", "ActiveQt")]
+            components["qtAxContainer"].includedirs = [os.path.join("include", "ActiveQt")]
             _create_module("AxServer", ["Core", "Gui", "Widgets", "AxBase"])
-            self.cpp_info.components["qtAxServer"].includedirs = [os.path.join("include", "ActiveQt")]
-            self.cpp_info.components["qtAxServer"].system_libs.append("shell32")
+            components["qtAxServer"].includedirs = [os.path.join("include", "ActiveQt")]
+            components["qtAxServer"].system_libs.append("shell32")
 
         if self.options.qtscript:
             _create_module("Script")
@@ -1260,67 +1389,95 @@ Examples = bin/datadir/examples""")
 
         if not self.options.shared:
             if self.settings.os == "Windows":
-                self.cpp_info.components["qtCore"].system_libs.append("version")  # qtcore requires "GetFileVersionInfoW" and "VerQueryValueW" which are in "Version.lib" library
-                self.cpp_info.components["qtCore"].system_libs.append("winmm")    # qtcore requires "__imp_timeSetEvent" which is in "Winmm.lib" library
-                self.cpp_info.components["qtCore"].system_libs.append("netapi32") # qtcore requires "NetApiBufferFree" which is in "Netapi32.lib" library
-                self.cpp_info.components["qtCore"].system_libs.append("userenv")  # qtcore requires "__imp_GetUserProfileDirectoryW " which is in "UserEnv.Lib" library
-                self.cpp_info.components["qtCore"].system_libs.append("ws2_32")  # qtcore requires "WSAStartup " which is in "Ws2_32.Lib" library
-                self.cpp_info.components["qtNetwork"].system_libs.append("dnsapi")  # qtnetwork from qtbase requires "DnsFree" which is in "Dnsapi.lib" library
-                self.cpp_info.components["qtNetwork"].system_libs.append("iphlpapi")
+                components["qtCore"].system_libs.append("version")  # qtcore requires "GetFileVersionInfoW" and "VerQueryValueW" which are in "Version.lib" library
+                components["qtCore"].system_libs.append("winmm")    # qtcore requires "__imp_timeSetEvent" which is in "Winmm.lib" library
+                components["qtCore"].system_libs.append("netapi32") # qtcore requires "NetApiBufferFree" which is in "Netapi32.lib" library
+                components["qtCore"].system_libs.append("userenv")  # qtcore requires "__imp_GetUserProfileDirectoryW " which is in "UserEnv.Lib" library
+                components["qtCore"].system_libs.append("ws2_32")  # qtcore requires "WSAStartup " which is in "Ws2_32.Lib" library
+                components["qtNetwork"].system_libs.append("dnsapi")  # qtnetwork from qtbase requires "DnsFree" which is in "Dnsapi.lib" library
+                components["qtNetwork"].system_libs.append("iphlpapi")
                 if self.options.widgets:
-                    self.cpp_info.components["qtWidgets"].system_libs.append("UxTheme")
-                    self.cpp_info.components["qtWidgets"].system_libs.append("dwmapi")
+                    components["qtWidgets"].system_libs.append("UxTheme")
+                    components["qtWidgets"].system_libs.append("dwmapi")
                 if self.options.qtwinextras:
-                    self.cpp_info.components["qtWinExtras"].system_libs.append("dwmapi")  # qtwinextras requires "DwmGetColorizationColor" which is in "dwmapi.lib" library
+                    components["qtWinExtras"].system_libs.append("dwmapi")  # qtwinextras requires "DwmGetColorizationColor" which is in "dwmapi.lib" library
 
 
             if self.settings.os == "Macos":
-                self.cpp_info.components["qtCore"].frameworks.append("IOKit")     # qtcore requires "_IORegistryEntryCreateCFProperty", "_IOServiceGetMatchingService" and much more which are in "IOKit" framework
-                self.cpp_info.components["qtCore"].frameworks.append("Cocoa")     # qtcore requires "_OBJC_CLASS_$_NSApplication" and more, which are in "Cocoa" framework
-                self.cpp_info.components["qtCore"].frameworks.append("Security")  # qtcore requires "_SecRequirementCreateWithString" and more, which are in "Security" framework
-                self.cpp_info.components["qtNetwork"].frameworks.append("SystemConfiguration")
-                self.cpp_info.components["qtNetwork"].frameworks.append("GSS")
+                components["qtCore"].frameworks.append("IOKit")     # qtcore requires "_IORegistryEntryCreateCFProperty", "_IOServiceGetMatchingService" and much more which are in "IOKit" framework
+                components["qtCore"].frameworks.append("Cocoa")     # qtcore requires "_OBJC_CLASS_$_NSApplication" and more, which are in "Cocoa" framework
+                components["qtCore"].frameworks.append("Security")  # qtcore requires "_SecRequirementCreateWithString" and more, which are in "Security" framework
+                components["qtNetwork"].frameworks.append("SystemConfiguration")
+                components["qtNetwork"].frameworks.append("GSS")
 
-        self.cpp_info.components["qtCore"].builddirs.append(os.path.join("bin","archdatadir","bin"))
+        components["qtCore"].builddirs.append(os.path.join("bin","archdatadir","bin"))
         build_modules.append(self._cmake_core_extras_file)
-        self.cpp_info.components["qtCore"].build_modules["cmake_find_package"].append(self._cmake_core_extras_file)
-        self.cpp_info.components["qtCore"].build_modules["cmake_find_package_multi"].append(self._cmake_core_extras_file)
+        components["qtCore"].build_modules["cmake_find_package"].append(self._cmake_core_extras_file)
+        components["qtCore"].build_modules["cmake_find_package_multi"].append(self._cmake_core_extras_file)
         build_modules.append(self._cmake_qt5_private_file("Core"))
-        self.cpp_info.components["qtCore"].build_modules["cmake_find_package"].append(self._cmake_qt5_private_file("Core"))
-        self.cpp_info.components["qtCore"].build_modules["cmake_find_package_multi"].append(self._cmake_qt5_private_file("Core"))
+        components["qtCore"].build_modules["cmake_find_package"].append(self._cmake_qt5_private_file("Core"))
+        components["qtCore"].build_modules["cmake_find_package_multi"].append(self._cmake_qt5_private_file("Core"))
 
-        for m in os.listdir(os.path.join("lib", "cmake")):
+        for m in os.listdir(os.path.join(package_folder, "lib", "cmake")):
             module = os.path.join("lib", "cmake", m, "%sMacros.cmake" % m)
             component_name = m.replace("Qt5", "qt")
-            if os.path.isfile(module):
+            if os.path.isfile(os.path.join(package_folder, module)):
                 build_modules.append(module)
-                self.cpp_info.components[component_name].build_modules["cmake_find_package"].append(module)
-                self.cpp_info.components[component_name].build_modules["cmake_find_package_multi"].append(module)
-            self.cpp_info.components[component_name].builddirs.append(os.path.join("lib", "cmake", m))
+                components[component_name].build_modules["cmake_find_package"].append(module)
+                components[component_name].build_modules["cmake_find_package_multi"].append(module)
+            components[component_name].builddirs.append(os.path.join("lib", "cmake", m))
 
         qt5core_config_extras_mkspec_dir_cmake = tools.load(
-            os.path.join("lib", "cmake", "Qt5Core", "Qt5CoreConfigExtrasMkspecDir.cmake"))
+            os.path.join(package_folder, "lib", "cmake", "Qt5Core", "Qt5CoreConfigExtrasMkspecDir.cmake"))
         mkspecs_dir_begin = qt5core_config_extras_mkspec_dir_cmake.find("mkspecs/")
         mkspecs_dir_end = qt5core_config_extras_mkspec_dir_cmake.find("\"", mkspecs_dir_begin)
         mkspecs_dir = qt5core_config_extras_mkspec_dir_cmake[mkspecs_dir_begin:mkspecs_dir_end].split('/')
         mkspecs_path = os.path.join("bin", "archdatadir", *mkspecs_dir)
-        assert os.path.exists(mkspecs_path)
-        self.cpp_info.components["qtCore"].includedirs.append(mkspecs_path)
+        assert os.path.exists(os.path.join(package_folder, mkspecs_path))
+        components["qtCore"].includedirs.append(mkspecs_path)
 
-        objects_dirs = glob.glob(os.path.join(self.package_folder, "lib", "objects-*/"))
+        objects_dirs = glob.glob(os.path.join(package_folder, "lib", "objects-*/"))
         for object_dir in objects_dirs:
             for m in os.listdir(object_dir):
                 component = "qt" + m[:m.find("_")]
-                if component not in self.cpp_info.components:
+                if component not in components:
                     continue
                 submodules_dir = os.path.join(object_dir, m)
                 for sub_dir in os.listdir(submodules_dir):
                     submodule_dir = os.path.join(submodules_dir, sub_dir)
-                    obj_files = [os.path.join(submodule_dir, file) for file in os.listdir(submodule_dir)]
-                    self.cpp_info.components[component].exelinkflags.extend(obj_files)
-                    self.cpp_info.components[component].sharedlinkflags.extend(obj_files)
+                    obj_files = [os.path.relpath(os.path.join(submodule_dir, file), package_folder) for file in os.listdir(submodule_dir)]
+                    components[component].objects.extend(obj_files)
+
+        return {"components": {name: component.serialize() for name, component in components.items()},
+                "build_modules": build_modules}
+
+    def package_info(self):
+        self.cpp_info.set_property("cmake_file_name", "Qt5")
+
+        self.cpp_info.names["cmake_find_package"] = "Qt5"
+        self.cpp_info.names["cmake_find_package_multi"] = "Qt5"
 
-        self.cpp_info.set_property("cmake_build_modules", build_modules)
+        components_file = os.path.join(self.package_folder, self._components_file)
+        graph = json.loads(tools.load(components_file)) if os.path.isfile(components_file) else {}
+        if graph.get("recipe_sha256") != self._recipe_sha256:
+            # package created before the component graph was stored in it, or by another recipe revision
+            graph = self._component_graph(self.package_folder)
+
+        for componentname, fields in graph["components"].items():
+            component = self.cpp_info.components[componentname]
+            for name, value in fields.get("properties", {}).items():
+                component.set_property(name, value)
+            component.names.update(fields.get("names", {}))
+            for generator, modules in fields.get("build_modules", {}).items():
+                component.build_modules[generator].extend(modules)
+            for field in _QtComponent.list_fields:
+                if field in fields:
+                    setattr(component, field, fields[field])
+            obj_files = [os.path.join(self.package_folder, obj) for obj in fields.get("objects", [])]
+            component.exelinkflags.extend(obj_files)
+            component.sharedlinkflags.extend(obj_files)
+
+        self.cpp_info.set_property("cmake_build_modules", graph["build_modules"])
 
     @staticmethod
     def _remove_duplicate(l):
@@ -5,6 +5,8 @@ from conans.model import Generator
 import configparser
 import glob
 import os
+import shutil
+import tarfile
 import textwrap
 
 required_conan_version = ">=1.43.0"
@@ -94,6 +96,10 @@ class QtConan(ConanFile):
         "sysroot": "ANY",
         "multiconfiguration": [True, False],
         "disabled_features": "ANY",
+        "webengine_jobs": "ANY",  # parallel jobs of the chromium ninja build (NINJAFLAGS)
+        "webengine_memory_per_job": "ANY",  # MiB of RAM budgeted per chromium job, caps webengine_jobs
+        "webengine_jumbo_build": [True, False],
+        "link_jobs": "ANY",  # maximum number of concurrent link steps of the Qt build
     }
     options.update({module: [True, False] for module in _submodules})
 
@@ -134,6 +140,10 @@ class QtConan(ConanFile):
         "sysroot": None,
         "multiconfiguration": False,
         "disabled_features": "",
+        "webengine_jobs": None,
+        "webengine_memory_per_job": None,
+        "webengine_jumbo_build": True,
+        "link_jobs": None,
     }
     default_options.update({module: False for module in _submodules})
 
@@ -239,6 +249,11 @@ class QtConan(ConanFile):
                 _enablemodule(module)
 
     def validate(self):
+        for option in ("webengine_jobs", "webengine_memory_per_job", "link_jobs"):
+            value = self.options.get_safe(option)
+            if value and (not str(value).isdigit() or int(str(value)) == 0):
+                raise ConanInvalidConfiguration("{} must be a positive integer".format(option))
+
         # C++ minimum standard required
         if self.settings.compiler.get_safe("cppstd"):
             tools.check_min_cppstd(self, 17)
@@ -399,9 +414,96 @@ class QtConan(ConanFile):
         if self.options.qtwayland:
             self.build_requires("wayland/1.20.0")
 
+    @property
+    def _source_archive(self):
+        url = self.conan_data["sources"][self.version]["url"]
+        return os.path.basename(url[0] if isinstance(url, list) else url)
+
+    @property
+    def _source_modules(self):
+        # top-level folders of the qt-everywhere archive which are extracted only when the module is built
+        return set(self._submodules).union(["qtbase", "qtqa", "qtrepotools"])
+
+    def _extract_sources(self, modules, skeleton=False):
+        """
+        extract some submodules from the qt-everywhere archive in a single pass over it
+        :param modules: submodules to extract, each one into its own temporary folder
+        :param skeleton: also extract the top-level files which are not part of a submodule into qt6
+        :return: dict with the temporary folder of each extracted submodule
+        """
+        qt6 = os.path.join(self.source_folder, "qt6")
+        tmp_folders = {module: os.path.join(qt6, ".{}.tmp{}".format(module, os.getpid())) for module in modules}
+        with tarfile.open(os.path.join(self.source_folder, self._source_archive)) as tar:
+            for member in tar:
+                path = member.name.split("/", 1)[1] if "/" in member.name else ""
+                module = path.split("/", 1)[0]
+                if module in tmp_folders:
+                    destination = tmp_folders[module]
+                    path = path[len(module) + 1:]
+                elif skeleton and module not in self._source_modules:
+                    destination = qt6
+                else:
+                    continue
+                if not path:
+                    continue
+                if member.islnk():
+                    link = member.linkname.split("/", 1)[1] if "/" in member.linkname else ""
+                    if destination != qt6:
+                        if not link.startswith(module + "/"):
+                            self.output.warn("skipping {}: hard link outside of {}".format(member.name, module))
+                            continue
+                        link = link[len(module) + 1:]
+                    member.linkname = link
+                member.name = path
+                tar.extract(member, destination)
+        return tmp_folders
+
+    def _prepare_source_module(self, module, folder):
+        # patching in source folder because of no_copy_source attribute
+        for patch in self.conan_data.get("patches", {}).get(self.version, []):
+            base_path = patch["base_path"].replace("\\", "/").split("/")
+            if base_path[:2] == ["qt6", module]:
+                tools.patch(patch_file=os.path.join(self.source_folder, patch["patch_file"]),
+                            base_path=os.path.join(folder, *base_path[2:]))
+
+        if module == "qtwebengine" and tools.Version(self.version) >= "6.2.0":
+            for f in ["renderer", os.path.join("renderer", "core"), os.path.join("renderer", "platform")]:
+                tools.replace_in_file(os.path.join(folder, "src", "3rdparty", "chromium", "third_party", "blink", f, "BUILD.gn"),
+                                      "  if (enable_precompiled_headers) {\n    if (is_win) {",
+                                      "  if (enable_precompiled_headers) {\n    if (false) {"
+                                      )
+
+        if module == "qtbase":
+            tools.replace_in_file(os.path.join(folder, "cmake", "QtInternalTargets.cmake"),
+                                  "-Zc:wchar_t",
+                                  "-Zc:wchar_t -Zc:twoPhase-")
+            for f in ["FindPostgreSQL.cmake"]:
+                file = os.path.join(folder, "cmake", f)
+                if os.path.isfile(file):
+                    os.remove(file)
+
+            # workaround QTBUG-94356
+            if tools.Version(self.version) >= "6.1.1":
+                tools.replace_in_file(os.path.join(folder, "cmake", "FindWrapZLIB.cmake"), '"-lz"', 'ZLIB::ZLIB')
+                tools.replace_in_file(os.path.join(folder, "configure.cmake"),
+                    "set_property(TARGET ZLIB::ZLIB PROPERTY IMPORTED_GLOBAL TRUE)",
+                    "")
+
+    def _extract_source_modules(self, modules, skeleton=False):
+        tmp_folders = self._extract_sources(modules, skeleton)
+        for module, folder in tmp_folders.items():
+            self._prepare_source_module(module, folder)
+            try:
+                os.rename(folder, os.path.join(self.source_folder, "qt6", module))
+            except OSError:
+                # extracted by a concurrent build sharing this source folder
+                shutil.rmtree(folder)
+
     def source(self):
-        tools.get(**self.conan_data["sources"][self.version],
-                  strip_root=True, destination="qt6")
+        # The archive is kept: only the top-level files and qtbase are extracted here, the other
+        # submodules are extracted by build() once the enabled modules are known
+        tools.download(**self.conan_data["sources"][self.version], filename=self._source_archive)
+        self._extract_source_modules(["qtbase"], skeleton=True)
 
         # patching in source method because of no_copy_source attribute
 
@@ -414,28 +516,64 @@ class QtConan(ConanFile):
                                "enable_testing()")
 
         for patch in self.conan_data.get("patches", {}).get(self.version, []):
-            tools.patch(**patch)
-        if tools.Version(self.version) >= "6.2.0":
-            for f in ["renderer", os.path.join("renderer", "core"), os.path.join("renderer", "platform")]:
-                tools.replace_in_file(os.path.join(self.source_folder, "qt6", "qtwebengine", "src", "3rdparty", "chromium", "third_party", "blink", f, "BUILD.gn"),
-                                      "  if (enable_precompiled_headers) {\n    if (is_win) {",
-                                      "  if (enable_precompiled_headers) {\n    if (false) {"
-                                      )
+            base_path = patch["base_path"].replace("\\", "/").split("/")
+            if len(base_path) < 2 or base_path[1] not in self._source_modules:
+                tools.patch(**patch)
+
+    def _extract_enabled_modules(self):
+        modules = [m for m in self._get_module_tree if m == "qtbase" or self.options.get_safe(m)]
+        missing = [m for m in modules if not os.path.isdir(os.path.join(self.source_folder, "qt6", m))]
+        if missing:
+            self.output.info("Extracting Qt submodules: %s" % ", ".join(missing))
+            self._extract_source_modules(missing)
+
+    @staticmethod
+    def _available_memory_mb():
+        """
+        obtain the physical memory available for new processes on the build machine
+        identical copies live in the boost, qt/5.x.x and qt/6.x.x recipes, a fix must be made to all of them
+        :return: available memory in MiB, or None if it can't be determined
+        """
+        try:
+            with open("/proc/meminfo") as meminfo:
+                for line in meminfo:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) // 1024
+        except (IOError, OSError, ValueError):
+            pass
+        try:
+            return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+        except (AttributeError, ValueError, OSError):
+            pass
+        if tools.os_info.is_windows:
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("sullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullAvailPhys // (1024 * 1024)
+        return None
 
-        tools.replace_in_file(os.path.join("qt6", "qtbase", "cmake", "QtInternalTargets.cmake"),
-                              "-Zc:wchar_t",
-                              "-Zc:wchar_t -Zc:twoPhase-")
-        for f in ["FindPostgreSQL.cmake"]:
-            file = os.path.join("qt6", "qtbase", "cmake", f)
-            if os.path.isfile(file):
-                os.remove(file)
-
-        # workaround QTBUG-94356
-        if tools.Version(self.version) >= "6.1.1":
-            tools.replace_in_file(os.path.join("qt6", "qtbase", "cmake", "FindWrapZLIB.cmake"), '"-lz"', 'ZLIB::ZLIB')
-            tools.replace_in_file(os.path.join("qt6", "qtbase", "configure.cmake"),
-                "set_property(TARGET ZLIB::ZLIB PROPERTY IMPORTED_GLOBAL TRUE)",
-                "")
+    @property
+    def _webengine_jobs(self):
+        """
+        number of parallel jobs of the chromium ninja build, None to let ninja decide
+        """
+        jobs = int(str(self.options.webengine_jobs)) if self.options.webengine_jobs else None
+        if self.options.webengine_memory_per_job:
+            available = self._available_memory_mb()
+            if available is None:
+                self.output.warn("Unable to determine the available memory, webengine_memory_per_job is ignored")
+            else:
+                jobs = max(1, min(jobs or tools.cpu_count(), available // int(str(self.options.webengine_memory_per_job))))
+        return jobs
 
     def _xplatform(self):
         if self.settings.os == "Linux":
@@ -563,6 +701,14 @@ class QtConan(ConanFile):
 
         self._cmake.definitions["FEATURE_system_zlib"] = "ON"
 
+        if self.options.get_safe("qtwebengine") and not self.options.webengine_jumbo_build:
+            # webengine-jumbo-build is enabled by default in src/core/configure.cmake
+            self._cmake.definitions["FEATURE_webengine_jumbo_build"] = "OFF"
+
+        if self.options.link_jobs:
+            self._cmake.definitions["CMAKE_JOB_POOLS"] = "conan_link_pool=%s" % self.options.link_jobs
+            self._cmake.definitions["CMAKE_JOB_POOL_LINK"] = "conan_link_pool"
+
         self._cmake.definitions["INPUT_opengl"] = self.options.get_safe("opengl", "no")
 
         # openSSL
@@ -655,31 +801,37 @@ class QtConan(ConanFile):
             raise
         return self._cmake
 
+    # Applied in order to the files generated by cmake_find_package, see build()
+    _find_package_substitutions = (
+        ("$<$<STREQUAL:$<TARGET_PROPERTY:TYPE>,SHARED_LIBRARY>:>", ""),
+        ("$<$<STREQUAL:$<TARGET_PROPERTY:TYPE>,MODULE_LIBRARY>:>", ""),
+        ("$<$<STREQUAL:$<TARGET_PROPERTY:TYPE>,EXECUTABLE>:>", ""),
+        ("$<$<STREQUAL:$<TARGET_PROPERTY:TYPE>,SHARED_LIBRARY>:-Wl,--export-dynamic>", ""),
+        ("$<$<STREQUAL:$<TARGET_PROPERTY:TYPE>,MODULE_LIBRARY>:-Wl,--export-dynamic>", ""),
+        (" IMPORTED)\n", " IMPORTED GLOBAL)\n"),
+    )
+
+    @staticmethod
+    def _rewrite_files(files, substitutions):
+        # One read and at most one write per file, whatever the number of substitutions
+        for f in files:
+            content = tools.load(f)
+            new_content = content
+            for search, replace in substitutions:
+                new_content = new_content.replace(search, replace)
+            if new_content != content:
+                tools.save(f, new_content)
+
     def build(self):
-        for f in glob.glob("*.cmake"):
-            tools.replace_in_file(f,
-                "$<$<STREQUAL:$<TARGET_PROPERTY:TYPE>,SHARED_LIBRARY>:>",
-                "", strict=False)
-            tools.replace_in_file(f,
-                "$<$<STREQUAL:$<TARGET_PROPERTY:TYPE>,MODULE_LIBRARY>:>",
-                "", strict=False)
-            tools.replace_in_file(f,
-                "$<$<STREQUAL:$<TARGET_PROPERTY:TYPE>,EXECUTABLE>:>",
-                "", strict=False)
-            tools.replace_in_file(f,
-                "$<$<STREQUAL:$<TARGET_PROPERTY:TYPE>,SHARED_LIBRARY>:-Wl,--export-dynamic>",
-                "", strict=False)
-            tools.replace_in_file(f,
-                "$<$<STREQUAL:$<TARGET_PROPERTY:TYPE>,MODULE_LIBRARY>:-Wl,--export-dynamic>",
-                "", strict=False)
-            tools.replace_in_file(f,
-                " IMPORTED)\n",
-                " IMPORTED GLOBAL)\n", strict=False)
+        self._extract_enabled_modules()
+        self._rewrite_files(glob.glob("*.cmake"), self._find_package_substitutions)
         with tools.vcvars(self) if self._is_msvc else tools.no_op():
             # next lines force cmake package to be in PATH before the one provided by visual studio (vcvars)
             build_env = tools.RunEnvironment(self).vars if self._is_msvc else {}
             build_env["MAKEFLAGS"] = "j%d" % tools.cpu_count()
             build_env["PKG_CONFIG_PATH"] = [self.build_folder]
+            if self.options.get_safe("qtwebengine") and self._webengine_jobs:
+                build_env["NINJAFLAGS"] = "-j%d" % self._webengine_jobs
             if self.settings.os == "Windows":
                 if not "PATH" in build_env:
                     build_env["PATH"] = []
@@ -826,6 +978,10 @@ class QtConan(ConanFile):
     def package_id(self):
         del self.info.options.cross_compile
         del self.info.options.sysroot
+        del self.info.options.webengine_jobs
+        del self.info.options.webengine_memory_per_job
+        del self.info.options.webengine_jumbo_build
+        del self.info.options.link_jobs
         if self.options.multiconfiguration and self._is_msvc:
             if self.settings.compiler == "Visual Studio":
                 if "MD" in self.settings.compiler.runtime:
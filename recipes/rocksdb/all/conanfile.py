@@ -28,8 +28,13 @@ class RocksDB(ConanFile):
         "with_zstd": [True, False],
         "with_tbb": [True, False],
         "with_jemalloc": [True, False],
-        "enable_sse": [False, "sse42", "avx2"],
+        "with_liburing": [True, False],
+        "with_numa": [True, False],
+        "with_folly": [True, False],
+        "instruction_set": ["portable", "sse42", "avx2", "avx512", "armv8-crc", "armv8-crypto"],
+        "enable_sse": [False, "sse42", "avx2", "deprecated"],
         "use_rtti": [True, False],
+        "build_tools": [True, False],
     }
     default_options = {
         "shared": False,
@@ -42,8 +47,13 @@ class RocksDB(ConanFile):
         "with_gflags": False,
         "with_tbb": False,
         "with_jemalloc": False,
-        "enable_sse": False,
+        "with_liburing": False,
+        "with_numa": False,
+        "with_folly": False,
+        "instruction_set": "portable",
+        "enable_sse": "deprecated",
         "use_rtti": False,
+        "build_tools": False,
     }
 
     generators = "cmake", "cmake_find_package"
@@ -61,6 +71,19 @@ class RocksDB(ConanFile):
     def _is_msvc(self):
         return str(self.settings.compiler) in ["Visual Studio", "msvc"]
 
+    @property
+    def _instruction_set_flags(self):
+        instruction_set = str(self.options.instruction_set)
+        if self._is_msvc:
+            return {"avx2": "/arch:AVX2", "avx512": "/arch:AVX512"}.get(instruction_set, "")
+        return {
+            "portable": "-march=armv8-a" if self.settings.os == "Macos" and self.settings.arch == "armv8" else "",
+            "avx2": "-mavx2 -mbmi -mlzcnt",
+            "avx512": "-mavx2 -mbmi -mlzcnt -mavx512f -mavx512bw -mavx512dq -mavx512vl",
+            "armv8-crc": "-march=armv8-a+crc",
+            "armv8-crypto": "-march=armv8-a+crc+crypto",
+        }.get(instruction_set, "")
+
     def export_sources(self):
         self.copy("CMakeLists.txt")
         for patch in self.conan_data.get("patches", {}).get(self.version, []):
@@ -71,12 +94,23 @@ class RocksDB(ConanFile):
             del self.options.fPIC
         if self.settings.arch != "x86_64":
             del self.options.with_tbb
+        if self.settings.os != "Linux":
+            del self.options.with_liburing
+            del self.options.with_numa
+        elif tools.Version(self.version) < "6.20":
+            del self.options.with_liburing
+        if tools.Version(self.version) < "6.8":
+            # older releases don't vendor folly's DistributedMutex in third-party/folly
+            del self.options.with_folly
         if self.settings.build_type == "Debug":
             self.options.use_rtti = True  # Rtti are used in asserts for debug mode...
 
     def configure(self):
         if self.options.shared:
             del self.options.fPIC
+        if self.options.enable_sse != "deprecated":
+            self.output.warn("enable_sse option is deprecated, use instruction_set instead")
+            self.options.instruction_set = {"False": "portable", "sse42": "sse42", "avx2": "avx2"}[str(self.options.enable_sse)]
 
     def requirements(self):
         if self.options.with_gflags:
@@ -93,6 +127,10 @@ class RocksDB(ConanFile):
             self.requires("onetbb/2020.3")
         if self.options.with_jemalloc:
             self.requires("jemalloc/5.2.1")
+        if self.options.get_safe("with_liburing"):
+            self.requires("liburing/2.1")
+        if self.options.get_safe("with_numa"):
+            self.requires("libnuma/2.0.14")
 
     def validate(self):
         if self.settings.compiler.get_safe("cppstd"):
@@ -123,6 +161,25 @@ class RocksDB(ConanFile):
            tools.Version(self.settings.compiler.version) < "5":
             raise ConanInvalidConfiguration("Rocksdb 6.20.3 is not compilable with gcc <5.") # See https://github.com/facebook/rocksdb/issues/3522
 
+        if self.options.build_tools:
+            # Without gflags, db_bench and ldb are stubs only printing an error
+            if not self.options.with_gflags:
+                raise ConanInvalidConfiguration("build_tools=True requires with_gflags=True")
+            if self.options.lite:
+                raise ConanInvalidConfiguration("build_tools=True cannot be combined with lite=True")
+
+        instruction_set = str(self.options.instruction_set)
+        if instruction_set in ["sse42", "avx2", "avx512"] and self.settings.arch != "x86_64":
+            raise ConanInvalidConfiguration("instruction_set={} requires arch=x86_64".format(instruction_set))
+        if instruction_set.startswith("armv8-"):
+            if self.settings.arch != "armv8":
+                raise ConanInvalidConfiguration("instruction_set={} requires arch=armv8".format(instruction_set))
+            if self._is_msvc:
+                raise ConanInvalidConfiguration("instruction_set={} is not supported with Visual Studio".format(instruction_set))
+
+    def package_id(self):
+        del self.info.options.enable_sse
+
     def source(self):
         tools.get(**self.conan_data["sources"][self.version],
                   destination=self._source_subfolder, strip_root=True)
@@ -133,10 +190,12 @@ class RocksDB(ConanFile):
 
         self._cmake.definitions["FAIL_ON_WARNINGS"] = False
         self._cmake.definitions["WITH_TESTS"] = False
-        self._cmake.definitions["WITH_TOOLS"] = False
-        self._cmake.definitions["WITH_CORE_TOOLS"] = False
-        self._cmake.definitions["WITH_BENCHMARK_TOOLS"] = False
-        self._cmake.definitions["WITH_FOLLY_DISTRIBUTED_MUTEX"] = False
+        # ldb and sst_dump come from WITH_CORE_TOOLS, or WITH_TOOLS in older releases, and db_bench from WITH_BENCHMARK_TOOLS
+        self._cmake.definitions["WITH_TOOLS"] = self.options.build_tools
+        self._cmake.definitions["WITH_CORE_TOOLS"] = self.options.build_tools
+        self._cmake.definitions["WITH_BENCHMARK_TOOLS"] = self.options.build_tools
+        # DistributedMutex is built from the subset of folly vendored by RocksDB, not from the folly package
+        self._cmake.definitions["WITH_FOLLY_DISTRIBUTED_MUTEX"] = self.options.get_safe("with_folly", False)
         if self._is_msvc:
             self._cmake.definitions["WITH_MD_LIBRARY"] = "MD" in msvc_runtime_flag(self)
         self._cmake.definitions["ROCKSDB_INSTALL_ON_WINDOWS"] = self.settings.os == "Windows"
@@ -148,27 +207,23 @@ class RocksDB(ConanFile):
         self._cmake.definitions["WITH_ZSTD"] = self.options.with_zstd
         self._cmake.definitions["WITH_TBB"] = self.options.get_safe("with_tbb", False)
         self._cmake.definitions["WITH_JEMALLOC"] = self.options.with_jemalloc
+        # Enabled by default upstream on Linux, which would pick up any liburing installed on the system
+        self._cmake.definitions["WITH_LIBURING"] = self.options.get_safe("with_liburing", False)
+        self._cmake.definitions["WITH_NUMA"] = self.options.get_safe("with_numa", False)
         self._cmake.definitions["ROCKSDB_BUILD_SHARED"] = self.options.shared
         self._cmake.definitions["ROCKSDB_LIBRARY_EXPORTS"] = self.settings.os == "Windows" and self.options.shared
         self._cmake.definitions["ROCKSDB_DLL" ] = self.settings.os == "Windows" and self.options.shared
 
         self._cmake.definitions["USE_RTTI"] = self.options.use_rtti
-        if self.options.enable_sse == "False":
-          self._cmake.definitions["PORTABLE"] = True
-          self._cmake.definitions["FORCE_SSE42"] = False
-        elif self.options.enable_sse == "sse42":
-          self._cmake.definitions["PORTABLE"] = True
-          self._cmake.definitions["FORCE_SSE42"] = True
-        elif self.options.enable_sse == "avx2":
-          self._cmake.definitions["PORTABLE"] = False
-          self._cmake.definitions["FORCE_SSE42"] = False
-
-        # not available yet in CCI
-
-        self._cmake.definitions["WITH_NUMA"] = False
-
-        if self.settings.os == "Macos" and self.settings.arch == "armv8":
-            self._cmake.definitions["CMAKE_CXX_FLAGS"] = "-march=armv8-a"
+        # PORTABLE=False would build with -march=native, so the instruction set is always given explicitly
+        self._cmake.definitions["PORTABLE"] = True
+        # Adds -msse4.2 -mpclmul, needed for the hardware CRC32C
+        self._cmake.definitions["FORCE_SSE42"] = self.options.instruction_set in ["sse42", "avx2", "avx512"]
+        # Added after the flags of the profile by the wrapper CMakeLists.txt
+        self._cmake.definitions["ROCKSDB_INSTRUCTION_SET_FLAGS"] = self._instruction_set_flags
+        if self.settings.arch == "armv8":
+            # Skips the compiler check making RocksDB add -march=armv8-a+crc+crypto to a portable build
+            self._cmake.definitions["HAS_ARMV8_CRC"] = self.options.instruction_set != "portable"
 
         self._cmake.configure(build_folder=self._build_subfolder)
         return self._cmake
@@ -203,6 +258,15 @@ class RocksDB(ConanFile):
             self._remove_static_libraries()
             self._remove_cpp_headers() # Force stable ABI for shared libraries
         tools.rmdir(os.path.join(self.package_folder, "lib", "cmake"))
+        if self.options.build_tools:
+            # RocksDB doesn't install its tools
+            for tool in self._tools:
+                self.copy(tool, src=os.path.join(self._build_subfolder, "bin"), dst="bin", keep_path=False)
+                self.copy(tool + ".exe", src=os.path.join(self._build_subfolder, "bin"), dst="bin", keep_path=False)
+
+    @property
+    def _tools(self):
+        return ["db_bench", "ldb", "sst_dump"]
 
     def package_info(self):
         cmake_target = "rocksdb-shared" if self.options.shared else "rocksdb"
@@ -239,3 +303,16 @@ class RocksDB(ConanFile):
             self.cpp_info.components["librocksdb"].requires.append("onetbb::onetbb")
         if self.options.with_jemalloc:
             self.cpp_info.components["librocksdb"].requires.append("jemalloc::jemalloc")
+        if self.options.get_safe("with_liburing"):
+            self.cpp_info.components["librocksdb"].requires.append("liburing::liburing")
+        if self.options.get_safe("with_numa"):
+            self.cpp_info.components["librocksdb"].requires.append("libnuma::libnuma")
+
+        if self.options.build_tools:
+            # db_bench, ldb and sst_dump, meant to be used from the build context
+            self.cpp_info.components["tools"].requires = ["librocksdb"]
+            self.cpp_info.components["tools"].set_property("cmake_target_name", "RocksDB::tools")
+            bin_path = os.path.join(self.package_folder, "bin")
+            self.output.info("Appending PATH environment variable: {}".format(bin_path))
+            self.buildenv_info.prepend_path("PATH", bin_path)
+            self.env_info.PATH.append(bin_path)
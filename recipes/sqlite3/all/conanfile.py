@@ -1,5 +1,6 @@
 from conans import ConanFile, CMake, tools
-from conans.errors import ConanInvalidConfiguration
+from conans.errors import ConanException, ConanInvalidConfiguration
+import glob
 import os
 import textwrap
 
@@ -40,6 +41,17 @@ class Sqlite3Conan(ConanFile):
         "build_executable": [True, False],
         "enable_default_vfs": [True, False],
         "enable_dbpage_vtab": [True, False],
+        "default_mmap_size": "ANY",
+        "max_mmap_size": "ANY",
+        "default_page_size": [None, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536],
+        "default_cache_size": "ANY",
+        "default_wal_synchronous": [None, "disabled", "normal", "full", "extra"],
+        "disable_memstatus": [True, False],
+        "like_doesnt_match_blobs": [True, False],
+        "enable_stat4": [True, False],
+        "max_worker_threads": "ANY",
+        "pgo": [True, False],
+        "pgo_workload": "ANY",
     }
     default_options = {
         "shared": False,
@@ -66,9 +78,20 @@ class Sqlite3Conan(ConanFile):
         "build_executable": True,
         "enable_default_vfs": True,
         "enable_dbpage_vtab": False,
+        "default_mmap_size": None,
+        "max_mmap_size": None,
+        "default_page_size": None,
+        "default_cache_size": None,
+        "default_wal_synchronous": None,
+        "disable_memstatus": False,
+        "like_doesnt_match_blobs": False,
+        "enable_stat4": False,
+        "max_worker_threads": None,
+        "pgo": False,
+        "pgo_workload": None,
     }
 
-    exports_sources = ["CMakeLists.txt"]
+    exports_sources = ["CMakeLists.txt", "pgo/*.sql"]
     generators = "cmake"
     _cmake = None
 
@@ -96,11 +119,51 @@ class Sqlite3Conan(ConanFile):
         if not self.options.enable_default_vfs and self.options.build_executable:
             # Need to provide custom VFS code: https://www.sqlite.org/custombuild.html
             raise ConanInvalidConfiguration("build_executable=True cannot be combined with enable_default_vfs=False")
+        for option, minimum in self._integer_options.items():
+            value = str(self.options.get_safe(option))
+            if value == "None":
+                continue
+            try:
+                valid = int(value) >= minimum if minimum is not None else True
+            except ValueError:
+                valid = False
+            if not valid:
+                raise ConanInvalidConfiguration("{}={} is not a valid value, it must be an integer{}".format(
+                    option, value, " >= {}".format(minimum) if minimum is not None else ""))
+
+        if self.options.pgo:
+            if self.settings.compiler not in ["gcc", "clang", "apple-clang"]:
+                raise ConanInvalidConfiguration("pgo=True is only supported with gcc, clang and apple-clang")
+            if tools.cross_building(self):
+                raise ConanInvalidConfiguration("pgo=True requires running the training workload, it can't be cross-built")
+            if not self.options.enable_default_vfs:
+                raise ConanInvalidConfiguration("pgo=True cannot be combined with enable_default_vfs=False")
+        elif self.options.pgo_workload:
+            raise ConanInvalidConfiguration("pgo_workload requires pgo=True")
+
+    @property
+    def _integer_options(self):
+        # option: minimum value. A negative default_cache_size is a size in KiB instead of pages
+        return {
+            "default_mmap_size": 0,
+            "max_mmap_size": 0,
+            "default_cache_size": None,
+            "max_worker_threads": 0,
+        }
+
+    def package_id(self):
+        # 0 would be dropped from the package id like an unset option, while it is a meaningful value
+        for option in ("default_mmap_size", "max_mmap_size", "default_cache_size", "max_worker_threads"):
+            if str(self.info.options.get_safe(option)) == "0":
+                setattr(self.info.options, option, "zero")
+        if self.info.options.pgo_workload:
+            pgo_workload_sha256 = tools.sha256sum(str(self.info.options.pgo_workload))
+            self.info.options.pgo_workload = pgo_workload_sha256
 
     def source(self):
         tools.get(**self.conan_data["sources"][self.version], destination=self._source_subfolder, strip_root=True)
 
-    def _configure_cmake(self):
+    def _configure_cmake(self, pgo_stage="use"):
         if self._cmake:
             return self._cmake
         self._cmake = CMake(self)
@@ -134,12 +197,63 @@ class Sqlite3Conan(ConanFile):
         self._cmake.definitions["MAX_BLOB_SIZE"] = self.options.max_blob_size
         self._cmake.definitions["DISABLE_DEFAULT_VFS"] = not self.options.enable_default_vfs
         self._cmake.definitions["ENABLE_DBPAGE_VTAB"] = self.options.enable_dbpage_vtab
-        
+        for option in ("default_mmap_size", "max_mmap_size", "default_page_size", "default_cache_size", "max_worker_threads"):
+            if str(self.options.get_safe(option)) != "None":
+                self._cmake.definitions[option.upper()] = self.options.get_safe(option)
+        if self.options.default_wal_synchronous:
+            self._cmake.definitions["DEFAULT_WAL_SYNCHRONOUS"] = ["disabled", "normal", "full", "extra"].index(str(self.options.default_wal_synchronous))
+        self._cmake.definitions["DISABLE_MEMSTATUS"] = self.options.disable_memstatus
+        self._cmake.definitions["LIKE_DOESNT_MATCH_BLOBS"] = self.options.like_doesnt_match_blobs
+        self._cmake.definitions["ENABLE_STAT4"] = self.options.enable_stat4
+        if self.options.pgo:
+            self._cmake.definitions["SQLITE3_PGO"] = pgo_stage
+            self._cmake.definitions["SQLITE3_PGO_PROFILE_DIR"] = self._pgo_profile_dir
+
         self._cmake.configure()
         return self._cmake
 
     def build(self):
-        cmake = self._configure_cmake()
+        if self.options.pgo:
+            self._build_with_pgo()
+        else:
+            cmake = self._configure_cmake()
+            cmake.build()
+
+    @property
+    def _pgo_profile_dir(self):
+        return os.path.join(self.build_folder, "pgo-profile").replace("\\", "/")
+
+    def _build_with_pgo(self):
+        tools.rmdir(self._pgo_profile_dir)
+        cmake = self._configure_cmake(pgo_stage="generate")
+        cmake.build()
+
+        # The sqlite3 shell linked against the instrumented library runs the training workload
+        if self.options.pgo_workload:
+            workload = tools.load(str(self.options.pgo_workload))
+        else:
+            workload = tools.load(os.path.join(self.source_folder, "pgo", "workload.sql"))
+            if self.options.enable_fts5:
+                workload += tools.load(os.path.join(self.source_folder, "pgo", "fts5.sql"))
+            elif self.options.enable_fts4 or self.options.enable_fts3:
+                workload += tools.load(os.path.join(self.source_folder, "pgo", "fts4.sql"))
+        tools.save("pgo-training.sql", ".output pgo-training.log\n" + workload)
+        for database in glob.glob("pgo-training.db*"):
+            os.unlink(database)
+        library_path = os.path.join(self.build_folder, "lib")
+        with tools.environment_append({"LD_LIBRARY_PATH": library_path, "DYLD_LIBRARY_PATH": library_path}):
+            self.run("{} -bail pgo-training.db \".read pgo-training.sql\"".format(os.path.join("bin", "sqlite3")))
+
+        # clang needs the raw profiles merged into the default.profdata file read by -fprofile-use
+        if "clang" in str(self.settings.compiler):
+            llvm_profdata = tools.XCRun(self.settings).find("llvm-profdata") if self.settings.compiler == "apple-clang" \
+                            else tools.which("llvm-profdata")
+            if not llvm_profdata:
+                raise ConanException("pgo=True requires llvm-profdata in PATH")
+            self.run("\"{0}\" merge -output=\"{1}/default.profdata\" \"{1}\"".format(llvm_profdata, self._pgo_profile_dir))
+
+        cmake.definitions["SQLITE3_PGO"] = "use"
+        cmake.configure()
         cmake.build()
 
     def package(self):
@@ -0,0 +1,14 @@
+-- Full-text search part of the pgo training workload, used when enable_fts5=True
+CREATE VIRTUAL TABLE documents USING fts5(title, body);
+BEGIN;
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 20000)
+INSERT INTO documents(title, body)
+SELECT 'document ' || i,
+       printf('%s %s %s sqlite database %s index query %s', name, country, status, i % 97, amount)
+FROM n JOIN orders ON orders.id = n.i JOIN customers ON customers.id = orders.customer_id;
+COMMIT;
+SELECT count(*) FROM documents WHERE documents MATCH 'sqlite AND paid';
+SELECT count(*) FROM documents WHERE documents MATCH 'index NOT shipped';
+SELECT title, bm25(documents) FROM documents WHERE documents MATCH '"database 42"' ORDER BY bm25(documents) LIMIT 10;
+SELECT highlight(documents, 1, '[', ']') FROM documents WHERE documents MATCH 'customer*' LIMIT 100;
+INSERT INTO documents(documents) VALUES('optimize');
@@ -0,0 +1,62 @@
+-- Training workload of the pgo option: bulk and single-row inserts, indexed lookups,
+-- range scans, joins, aggregates, updates and deletes on a WAL database.
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+
+CREATE TABLE customers(id INTEGER PRIMARY KEY, name TEXT NOT NULL, country TEXT NOT NULL, created REAL NOT NULL);
+CREATE TABLE orders(id INTEGER PRIMARY KEY, customer_id INTEGER NOT NULL REFERENCES customers(id), amount REAL NOT NULL, status TEXT NOT NULL, note BLOB);
+CREATE TABLE kv(key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+
+BEGIN;
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 20000)
+INSERT INTO customers(id, name, country, created)
+SELECT i, 'customer-' || i, char(65 + i % 26, 65 + i % 7), julianday('2020-01-01') + i % 1000 FROM n;
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000)
+INSERT INTO orders(customer_id, amount, status, note)
+SELECT 1 + abs(random()) % 20000, (abs(random()) % 100000) / 100.0,
+       CASE i % 4 WHEN 0 THEN 'new' WHEN 1 THEN 'paid' WHEN 2 THEN 'shipped' ELSE 'cancelled' END,
+       randomblob(i % 64)
+FROM n;
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 50000)
+INSERT INTO kv(key, value) SELECT printf('key:%08d', i), hex(randomblob(16)) FROM n;
+COMMIT;
+
+CREATE INDEX orders_customer ON orders(customer_id);
+CREATE INDEX orders_status_amount ON orders(status, amount);
+CREATE INDEX customers_country ON customers(country);
+ANALYZE;
+
+-- Point lookups through the rowid, a secondary index and a WITHOUT ROWID table
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 50000)
+SELECT count(*), sum(o.amount) FROM n JOIN orders o ON o.id = 1 + (n.i * 7919) % 200000;
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 20000)
+SELECT count(*) FROM n JOIN orders o ON o.customer_id = n.i;
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 50000)
+SELECT count(*) FROM n JOIN kv ON kv.key = printf('key:%08d', 1 + (n.i * 104729) % 50000);
+
+-- Range scans, joins and aggregates
+SELECT status, count(*), avg(amount), max(amount) FROM orders GROUP BY status;
+SELECT count(*) FROM orders WHERE status = 'paid' AND amount BETWEEN 100 AND 200;
+SELECT c.country, count(o.id), sum(o.amount) FROM customers c JOIN orders o ON o.customer_id = c.id
+GROUP BY c.country ORDER BY 3 DESC LIMIT 20;
+SELECT c.name, t.total FROM customers c
+JOIN (SELECT customer_id, sum(amount) AS total FROM orders GROUP BY customer_id) t ON t.customer_id = c.id
+ORDER BY t.total DESC LIMIT 100;
+SELECT count(*) FROM customers c WHERE NOT EXISTS (SELECT 1 FROM orders o WHERE o.customer_id = c.id AND o.status = 'cancelled');
+SELECT customer_id, amount, rank() OVER (PARTITION BY customer_id ORDER BY amount DESC) FROM orders WHERE customer_id < 500;
+SELECT substr(name, 1, 10), upper(country), length(note), typeof(note) FROM customers JOIN orders ON orders.customer_id = customers.id LIMIT 5000;
+SELECT count(*) FROM customers WHERE name LIKE 'customer-1%';
+
+-- Updates and deletes, in bulk and as small transactions
+UPDATE orders SET status = 'shipped' WHERE status = 'paid' AND amount < 50;
+UPDATE customers SET created = created + 1 WHERE country = 'AA';
+DELETE FROM orders WHERE status = 'cancelled' AND amount > 900;
+WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 2000)
+SELECT count(*) FROM n;
+INSERT INTO kv(key, value) VALUES('single:1', 'a') ON CONFLICT(key) DO UPDATE SET value = excluded.value;
+INSERT INTO kv(key, value) VALUES('single:1', 'b') ON CONFLICT(key) DO UPDATE SET value = excluded.value;
+REPLACE INTO kv(key, value) VALUES('single:2', 'c');
+DELETE FROM kv WHERE key = 'single:2';
+PRAGMA wal_checkpoint(TRUNCATE);
+PRAGMA integrity_check;
+VACUUM;
@@ -0,0 +1,102 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <sqlite3.h>
+
+#define DB_NAME "benchmark.db"
+
+static sqlite3_int64 now_ms(void) {
+    sqlite3_int64 t = 0;
+    sqlite3_vfs* vfs = sqlite3_vfs_find(NULL);
+    vfs->xCurrentTimeInt64(vfs, &t);
+    return t;
+}
+
+static void report(const char* name, int count, sqlite3_int64 elapsed_ms) {
+    if (elapsed_ms <= 0) {
+        elapsed_ms = 1;
+    }
+    printf("%-24s %8d rows %8lld ms %12.0f rows/s\n", name, count, (long long)elapsed_ms, count * 1000.0 / elapsed_ms);
+}
+
+static int check(sqlite3* db, int result, int expected) {
+    if (result != expected) {
+        fprintf(stderr, "SQL error: %s\n", sqlite3_errmsg(db));
+        return 0;
+    }
+    return 1;
+}
+
+int main(int argc, char** argv) {
+    const int rows = argc > 1 && atoi(argv[1]) > 0 ? atoi(argv[1]) : 200000;
+    const int commits = rows / 100;
+    sqlite3* db = NULL;
+    sqlite3_stmt* stmt = NULL;
+    sqlite3_int64 start;
+    unsigned int seed = 12345;
+    int i;
+    int result = EXIT_FAILURE;
+
+    printf("SQLite Version: %s\n", sqlite3_libversion());
+    for (i = 0; sqlite3_compileoption_get(i) != NULL; ++i) {
+        printf("  SQLITE_%s\n", sqlite3_compileoption_get(i));
+    }
+
+    remove(DB_NAME);
+    remove(DB_NAME "-wal");
+    remove(DB_NAME "-shm");
+    if (!check(db, sqlite3_open(DB_NAME, &db), SQLITE_OK)
+        || !check(db, sqlite3_exec(db, "PRAGMA journal_mode=WAL;"
+                                       "CREATE TABLE kv(id INTEGER PRIMARY KEY, value TEXT NOT NULL);", NULL, NULL, NULL), SQLITE_OK)
+        || !check(db, sqlite3_prepare_v2(db, "INSERT INTO kv(id, value) VALUES(?, ?)", -1, &stmt, NULL), SQLITE_OK)) {
+        goto done;
+    }
+
+    /* Bulk insert in a single transaction */
+    start = now_ms();
+    sqlite3_exec(db, "BEGIN", NULL, NULL, NULL);
+    for (i = 0; i < rows; ++i) {
+        sqlite3_bind_int(stmt, 1, i);
+        sqlite3_bind_text(stmt, 2, "0123456789abcdef0123456789abcdef0123456789abcdef", -1, SQLITE_STATIC);
+        if (!check(db, sqlite3_step(stmt), SQLITE_DONE)) {
+            goto done;
+        }
+        sqlite3_reset(stmt);
+    }
+    sqlite3_exec(db, "COMMIT", NULL, NULL, NULL);
+    report("insert (1 transaction)", rows, now_ms() - start);
+
+    /* One transaction per row, dominated by the WAL synchronous setting */
+    start = now_ms();
+    for (i = 0; i < commits; ++i) {
+        sqlite3_bind_int(stmt, 1, rows + i);
+        sqlite3_bind_text(stmt, 2, "0123456789abcdef", -1, SQLITE_STATIC);
+        if (!check(db, sqlite3_step(stmt), SQLITE_DONE)) {
+            goto done;
+        }
+        sqlite3_reset(stmt);
+    }
+    report("insert (autocommit)", commits, now_ms() - start);
+    sqlite3_finalize(stmt);
+    stmt = NULL;
+
+    /* Point selects on the primary key, in random order */
+    if (!check(db, sqlite3_prepare_v2(db, "SELECT value FROM kv WHERE id = ?", -1, &stmt, NULL), SQLITE_OK)) {
+        goto done;
+    }
+    start = now_ms();
+    for (i = 0; i < rows; ++i) {
+        seed = seed * 1103515245u + 12345u;
+        sqlite3_bind_int(stmt, 1, (int)((seed >> 8) % (unsigned int)rows));
+        if (!check(db, sqlite3_step(stmt), SQLITE_ROW)) {
+            goto done;
+        }
+        sqlite3_reset(stmt);
+    }
+    report("point select", rows, now_ms() - start);
+    result = EXIT_SUCCESS;
+
+done:
+    sqlite3_finalize(stmt);
+    sqlite3_close(db);
+    return result;
+}
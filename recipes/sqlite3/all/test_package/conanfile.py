@@ -16,3 +16,8 @@ class TestPackageConan(ConanFile):
         if not tools.cross_building(self):
             bin_path = os.path.join("bin", "test_package")
             self.run(bin_path, run_environment=True)
+            # Opt-in insert and point-select micro-benchmark, e.g. SQLITE3_BENCHMARK=1 or SQLITE3_BENCHMARK=<rows>
+            benchmark = tools.get_env("SQLITE3_BENCHMARK")
+            if benchmark and self.options["sqlite3"].enable_default_vfs:
+                rows = benchmark if benchmark.isdigit() and int(benchmark) > 1 else ""
+                self.run("{} {}".format(os.path.join("bin", "benchmark"), rows), run_environment=True)